@@ -0,0 +1,238 @@
+import hashlib
+import json
+import threading
+from functools import partial
+from uuid import uuid4
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import Http404
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from foodgram_backend.constants import RECIPE_DETAIL_CACHE_TIMEOUT
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag)
+from users.models import Follow, User
+
+from .serializers import (IngredientSerializer, RecipeReadSerializer,
+                          TagSerializer)
+
+
+def current_versions(*keys):
+    """Токены версий из кэша одним get_many; недостающие создаются."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    cache.set(key, uuid4().hex, timeout=None)
+
+
+class ReferenceCache:
+    """
+    Сериализованный справочник в памяти процесса.
+
+    Данные строятся лениво при первом обращении. Версия хранится
+    в кэше Django: сигналы моделей меняют её, и каждый процесс,
+    заметив новую версию, перестраивает свою копию.
+    """
+
+    def __init__(self, name, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.version_key = f'reference:{name}:version'
+        self._entry = None
+        self._lock = threading.Lock()
+        for signal in (post_save, post_delete):
+            signal.connect(self.invalidate, sender=model, weak=False)
+
+    def current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid4().hex, timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self, **kwargs):
+        cache.set(self.version_key, uuid4().hex, timeout=None)
+
+    def get(self):
+        """Возвращает (data, etag); data — неизменяемый кортеж записей."""
+        version = self.current_version()
+        entry = self._entry
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] != version:
+                    entry = self._entry = (version, *self.build())
+        return entry[1], entry[2]
+
+    def build(self):
+        data = tuple(
+            self.serializer_class(self.model.objects.all(), many=True).data
+        )
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+        etag = hashlib.md5(content.encode()).hexdigest()
+        return data, f'"{etag}"'
+
+    def response(self, request):
+        data, etag = self.get()
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+        return Response(list(data), headers={'ETag': etag})
+
+
+tags_cache = ReferenceCache('tags', Tag, TagSerializer)
+ingredients_cache = ReferenceCache(
+    'ingredients', Ingredient, IngredientSerializer
+)
+
+
+class RecipeDetailCache:
+    """
+    Общая для процессов копия ответа RecipeReadSerializer без полей,
+    зависящих от пользователя: is_favorited, is_in_shopping_cart
+    и author.is_subscribed подставляются в каждом запросе.
+
+    Ключ записи собирается из поколений рецепта и автора, версий
+    справочников тегов и ингредиентов, updated_at и хоста запроса
+    (в ответе абсолютные URL картинок). Сигналы после коммита меняют
+    поколение, и устаревшая запись становится недостижимой.
+    """
+    author_fields = frozenset(('username', 'email', 'first_name', 'last_name'))
+    # Меняется вместе с любым поколением рецепта или автора: от него
+    # зависит ETag списков рецептов.
+    list_key = 'recipe:list:generation'
+
+    def __init__(self, serializer_class, timeout):
+        self.serializer_class = serializer_class
+        self.timeout = timeout
+        for signal in (post_save, post_delete):
+            signal.connect(self.recipe_changed, sender=Recipe, weak=False)
+            for model in (RecipeIngredient, RecipeTag):
+                signal.connect(
+                    self.recipe_part_changed, sender=model, weak=False
+                )
+        m2m_changed.connect(
+            self.recipe_tags_changed, sender=RecipeTag, weak=False
+        )
+        post_save.connect(self.author_changed, sender=User, weak=False)
+
+    @staticmethod
+    def recipe_key(pk):
+        return f'recipe:detail:{pk}:generation'
+
+    @staticmethod
+    def author_key(pk):
+        return f'recipe:detail:author:{pk}:generation'
+
+    def invalidate(self, key):
+        transaction.on_commit(partial(bump_version, key))
+        transaction.on_commit(partial(bump_version, self.list_key))
+
+    def recipe_changed(self, instance, **kwargs):
+        self.invalidate(self.recipe_key(instance.pk))
+
+    def recipe_part_changed(self, instance, **kwargs):
+        self.invalidate(self.recipe_key(instance.recipe_id))
+
+    def recipe_tags_changed(self, instance, action, reverse, pk_set,
+                            **kwargs):
+        if not action.startswith('post_'):
+            return
+        if not reverse:
+            self.invalidate(self.recipe_key(instance.pk))
+            return
+        recipe_ids = pk_set
+        if recipe_ids is None:
+            recipe_ids = instance.recipes.values_list('pk', flat=True)
+        for pk in recipe_ids:
+            self.invalidate(self.recipe_key(pk))
+
+    def author_changed(self, instance, update_fields=None, **kwargs):
+        if update_fields and self.author_fields.isdisjoint(update_fields):
+            return
+        self.invalidate(self.author_key(instance.pk))
+
+    def user_state(self, request, pk):
+        """updated_at, автор и поля текущего пользователя одним запросом."""
+        user = request.user
+        recipes = Recipe.objects.with_user_flags(user).filter(pk=pk)
+        if user.is_authenticated:
+            recipes = recipes.annotate(is_subscribed=Exists(
+                Follow.objects.filter(
+                    user=user, following=OuterRef('author')
+                )
+            ))
+        else:
+            recipes = recipes.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        state = recipes.values(
+            'updated_at', 'author_id', 'is_favorited',
+            'is_in_shopping_cart', 'is_subscribed'
+        ).first()
+        if state is None:
+            raise Http404
+        return state
+
+    def versions(self, pk=None, author_id=None):
+        """
+        Токены, от которых зависит тело ответа: версии справочников и
+        поколения рецепта и автора, а для списка (pk=None) — общее
+        поколение рецептов.
+        """
+        if pk is None:
+            keys = [self.list_key]
+        else:
+            keys = [self.recipe_key(pk), self.author_key(author_id)]
+        return current_versions(
+            *keys, tags_cache.version_key, ingredients_cache.version_key
+        )
+
+    def key(self, request, pk, state):
+        versions = self.versions(pk, state['author_id'])
+        fingerprint = repr((
+            versions,
+            state['updated_at'].isoformat(),
+            request.build_absolute_uri('/'),
+        ))
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        return f'recipe:detail:{pk}:{digest}'
+
+    def build(self, request, pk):
+        recipe = Recipe.objects.for_read(AnonymousUser()).get(pk=pk)
+        return json.loads(json.dumps(
+            self.serializer_class(recipe, context={'request': request}).data,
+            cls=JSONEncoder
+        ))
+
+    def response(self, request, pk):
+        state = self.user_state(request, pk)
+        key = self.key(request, pk, state)
+        data = cache.get(key)
+        if data is None:
+            data = self.build(request, pk)
+            cache.set(key, data, timeout=self.timeout)
+        data['is_favorited'] = state['is_favorited']
+        data['is_in_shopping_cart'] = state['is_in_shopping_cart']
+        data['author']['is_subscribed'] = state['is_subscribed']
+        return Response(data)
+
+
+recipe_detail_cache = RecipeDetailCache(
+    RecipeReadSerializer, RECIPE_DETAIL_CACHE_TIMEOUT
+)
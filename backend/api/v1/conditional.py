@@ -0,0 +1,80 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+
+from recipes.models import BuyList, Favorite
+from users.models import Follow, User
+
+from .cache import recipe_detail_cache
+
+
+def scalar_subquery(model, aggregate):
+    return Subquery(
+        model.objects
+        .filter(user=OuterRef('pk'))
+        .order_by()
+        .values('user')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def user_state(user):
+    """
+    Отпечаток избранного, корзины и подписок пользователя.
+
+    Эти таблицы только пополняются и очищаются, а id растут монотонно,
+    поэтому пара (count, max(id)) меняется при любом их изменении.
+    """
+    if not user.is_authenticated:
+        return ()
+    annotations = {}
+    for model in (Favorite, BuyList, Follow):
+        name = model._meta.model_name
+        annotations[f'{name}_count'] = scalar_subquery(model, Count('pk'))
+        annotations[f'{name}_max'] = scalar_subquery(model, Max('pk'))
+    return tuple(
+        User.objects.filter(pk=user.pk)
+        .annotate(**annotations)
+        .values_list(*annotations)
+        .get()
+    )
+
+
+def recipe_etag(request, queryset, pk=None):
+    """
+    ETag выборки рецептов: max(updated_at) и count по отфильтрованному
+    queryset, токены кэша карточек (правки ингредиентов, тегов и профиля
+    автора) и состояние текущего пользователя, от которого зависят
+    is_favorited, is_in_shopping_cart и is_subscribed.
+
+    Last-Modified не отдаётся: max(updated_at) не меняется ни при
+    удалении рецепта, ни при правке справочников и автора.
+    """
+    recipes = queryset.aggregate(
+        last_modified=Max('updated_at'), count=Count('pk'),
+        author=Max('author')
+    )
+    last_modified = recipes['last_modified']
+    state = (
+        request.user.pk,
+        last_modified.isoformat() if last_modified else None,
+        recipes['count'],
+        *recipe_detail_cache.versions(pk, recipes['author']),
+        *user_state(request.user),
+    )
+    return f'W/"{hashlib.md5(repr(state).encode()).hexdigest()}"'
+
+
+def conditional_response(request, queryset, get_response, pk=None):
+    """
+    304 без сериализации, если клиентская копия актуальна,
+    иначе ответ get_response() с ETag в заголовках.
+    """
+    etag = recipe_etag(request, queryset, pk)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    return response
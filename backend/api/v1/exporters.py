@@ -0,0 +1,83 @@
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram_backend.constants import (SHOPPING_LIST_CHUNK_SIZE,
+                                        SHOPPING_LIST_PDF_FONT_SIZE,
+                                        SHOPPING_LIST_PDF_MARGIN)
+from recipes.models import ShoppingListItem
+
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+def shopping_list_rows(user):
+    """
+    Строки списка покупок в базовых единицах из ShoppingListItem,
+    читаемые серверным курсором.
+    """
+    return (
+        ShoppingListItem.objects
+        .totals(user)
+        .values_list('ingredient_name', 'unit', 'total')
+        .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+    )
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(rows):
+    for name, unit, amount in rows:
+        yield f'{name}: {amount}{unit}\n'
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for name, unit, amount in rows:
+        yield writer.writerow((name, amount, unit))
+
+
+def export_pdf(rows):
+    """
+    PDF нельзя отдавать по мере чтения строк: таблица ссылок пишется
+    в конце файла. Размер документа ограничен числом различных
+    ингредиентов, а не размером корзины, поэтому он собирается в буфере
+    и отдаётся кусками.
+    """
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+        )
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    line_height = SHOPPING_LIST_PDF_FONT_SIZE * 1.5
+    y = height - SHOPPING_LIST_PDF_MARGIN
+    pdf.setFont(PDF_FONT_NAME, SHOPPING_LIST_PDF_FONT_SIZE)
+    for name, unit, amount in rows:
+        if y < SHOPPING_LIST_PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT_NAME, SHOPPING_LIST_PDF_FONT_SIZE)
+            y = height - SHOPPING_LIST_PDF_MARGIN
+        pdf.drawString(SHOPPING_LIST_PDF_MARGIN, y, f'{name}: {amount}{unit}')
+        y -= line_height
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(SHOPPING_LIST_CHUNK_SIZE), b'')
+
+
+SHOPPING_LIST_EXPORTERS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'pdf': (export_pdf, 'application/pdf'),
+}
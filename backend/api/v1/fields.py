@@ -1,9 +1,17 @@
 import base64
+import binascii
+import hashlib
+from tempfile import SpooledTemporaryFile
 
 import webcolors
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
+from foodgram_backend.constants import BASE64_CHUNK_SIZE, IMAGE_RENDITIONS
+from recipes.images import RENDITION_FORMATS, rendition_name
+
 
 class Hex2NameColor(serializers.Field):
     def to_representation(self, value):
@@ -17,12 +25,104 @@ class Hex2NameColor(serializers.Field):
         return data
 
 
+def decode_base64(imgstr):
+    """
+    Декодирует base64 кусками во временный файл, считая sha256
+    по ходу, без второй полной копии картинки в памяти.
+    """
+    content = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    digest = hashlib.sha256()
+    for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+        chunk = base64.b64decode(
+            imgstr[start:start + BASE64_CHUNK_SIZE], validate=True
+        )
+        digest.update(chunk)
+        content.write(chunk)
+    content.seek(0)
+    return content, digest.hexdigest()
+
+
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            try:
+                content, digest = decode_base64(imgstr)
+            except binascii.Error:
+                self.fail('invalid_image')
+            image = super().to_internal_value(
+                File(content, name=f'{digest}.{ext}')
+            )
+            stored_name = self.parent.Meta.model._meta.get_field(
+                self.source
+            ).generate_filename(None, image.name)
+            if default_storage.exists(stored_name):
+                return stored_name
+            return image
 
         return super().to_internal_value(data)
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """Список id, который разрешается в объекты одним запросом."""
+    child = serializers.IntegerField()
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = self.queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                raise serializers.ValidationError(
+                    f'Недопустимый первичный ключ "{pk}" - '
+                    f'объект не существует.'
+                )
+        return [objects[pk] for pk in pks]
+
+    def to_representation(self, value):
+        return [obj.pk for obj in value.all()]
+
+
+class ImageRenditionsField(serializers.Field):
+    """
+    Ссылки на уменьшенные копии изображения рецепта. Пока фоновый
+    пул их не создал, все ссылки ведут на оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        if not recipe.renditions_ready:
+            original = self.build_url(recipe.image.name)
+            return {
+                rendition: dict.fromkeys(RENDITION_FORMATS, original)
+                for rendition in IMAGE_RENDITIONS
+            }
+        return {
+            rendition: {
+                extension: self.build_url(
+                    rendition_name(recipe.image.name, rendition, extension)
+                )
+                for extension in RENDITION_FORMATS
+            }
+            for rendition in IMAGE_RENDITIONS
+        }
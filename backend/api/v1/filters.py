@@ -1,15 +1,28 @@
 import django_filters
+from django.db.models import Exists, OuterRef
 from django_filters import filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from foodgram_backend.constants import INGREDIENT_AUTOCOMPLETE_LIMIT
+from recipes.models import Ingredient, Recipe, RecipeTag, Tag
+
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
 
 
 class RecipeFilter(django_filters.FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='get_tags',
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=(
+            (TAGS_MODE_ANY, 'Любой из тегов'),
+            (TAGS_MODE_ALL, 'Все теги'),
+        ),
+        method='get_tags_mode',
     )
+    search = filters.CharFilter(method='get_search')
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
     )
@@ -19,28 +32,55 @@ class RecipeFilter(django_filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'tags_mode', 'search',
+            'is_favorited', 'is_in_shopping_cart'
+        )
+
+    def get_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.search(value)
+
+    def get_tags(self, queryset, name, value):
+        """
+        EXISTS по RecipeTag вместо JOIN: рецепт с несколькими
+        подходящими тегами не размножается, и DISTINCT не нужен.
+        """
+        if not value:
+            return queryset
+        tag_ids = [tag.id for tag in value]
+        if self.form.cleaned_data.get('tags_mode') == TAGS_MODE_ALL:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(Exists(RecipeTag.objects.filter(
+                    recipe=OuterRef('pk'), tag_id=tag_id
+                )))
+            return queryset
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
+    def get_tags_mode(self, queryset, name, value):
+        return queryset
 
     def get_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                favorites__user=self.request.user
-            )
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                shopping_list__user=self.request.user
-            )
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
 
 class IngredientFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(
-        field_name='name', lookup_expr='startswith'
-    )
+    name = django_filters.CharFilter(method='get_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def get_name(self, queryset, name, value):
+        return queryset.search(value)[:INGREDIENT_AUTOCOMPLETE_LIMIT]
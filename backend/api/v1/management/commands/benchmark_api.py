@@ -0,0 +1,109 @@
+import math
+import random
+import tracemalloc
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.test import APIClient
+
+from recipes.seeding import seed_dataset
+from users.models import User
+
+ENDPOINTS = (
+    ('recipe list (anon)', False,
+     lambda rng, recipe_ids: '/api/recipes/?limit=6'),
+    ('recipe list', True,
+     lambda rng, recipe_ids: '/api/recipes/?limit=6'),
+    ('recipe detail', True,
+     lambda rng, recipe_ids: f'/api/recipes/{rng.choice(recipe_ids)}/'),
+    ('subscriptions', True,
+     lambda rng, recipe_ids: '/api/users/subscriptions/?recipes_limit=3'),
+    ('ingredient search', False,
+     lambda rng, recipe_ids: f'/api/ingredients/?name=ингредиент '
+                             f'{rng.randint(1, 9)}'),
+    ('shopping list', True,
+     lambda rng, recipe_ids: '/api/recipes/download_shopping_cart/'),
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def fetch(client, path):
+    response = client.get(path)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет основные эндпоинты на синтетических данных во временной '
+        'тестовой БД и печатает p50/p95, число запросов и пик памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run(self, options):
+        started = perf_counter()
+        user_ids, recipe_ids = seed_dataset(
+            users=options['users'], recipes=options['recipes'],
+            ingredients=options['ingredients'], seed=options['seed'],
+        )
+        self.stdout.write(
+            f'Данные: {len(user_ids)} пользователей, {len(recipe_ids)} '
+            f'рецептов, {perf_counter() - started:.1f} с на заполнение\n'
+        )
+        rng = random.Random(options['seed'])
+        users = list(User.objects.filter(id__in=user_ids[:50]))
+
+        self.stdout.write(
+            f'{"endpoint":<20}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"запросы":>10}{"пик, КиБ":>12}'
+        )
+        for name, authenticated, build_path in ENDPOINTS:
+            client = APIClient()
+            timings, queries, peaks = [], [], []
+            for iteration in range(options['iterations']):
+                if authenticated:
+                    client.force_authenticate(rng.choice(users))
+                path = build_path(rng, recipe_ids)
+                with CaptureQueriesContext(connection) as context:
+                    start = perf_counter()
+                    fetch(client, path)
+                    timings.append(perf_counter() - start)
+                queries.append(len(context.captured_queries))
+                if iteration < 5:
+                    tracemalloc.start()
+                    fetch(client, path)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+            self.stdout.write(
+                f'{name:<20}'
+                f'{percentile(timings, 50) * 1000:>10.1f}'
+                f'{percentile(timings, 95) * 1000:>10.1f}'
+                f'{percentile(queries, 50):>10}'
+                f'{max(peaks) / 1024:>12.0f}'
+            )
@@ -0,0 +1,160 @@
+import random
+import sys
+from contextlib import contextmanager
+from io import BytesIO
+from time import perf_counter
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+from rest_framework.authtoken.models import Token
+
+from foodgram_backend.postgresql.base import drain_pools, pools
+from recipes.seeding import seed_dataset
+from users.models import User
+
+from .benchmark_api import Command as BenchmarkCommand
+from .benchmark_api import percentile
+
+# Настройки соединения, которые settings.py выставляет по DB_CONN_MODE.
+# Пул на один поток: бенчмарк шлёт запросы последовательно.
+CONNECTION_MODES = {
+    'none': {'CONN_MAX_AGE': 0, 'HEALTH_CHECKS': False, 'POOL': None},
+    'persistent': {'CONN_MAX_AGE': 60, 'HEALTH_CHECKS': False, 'POOL': None},
+    'pool': {
+        'CONN_MAX_AGE': 0, 'HEALTH_CHECKS': True,
+        'POOL': {'SIZE': 1, 'TIMEOUT': 10, 'MAX_AGE': 600},
+    },
+}
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+POOL_ENGINE = 'foodgram_backend.postgresql'
+RECIPE_LIST = ('/api/recipes/', 'limit=6')
+
+
+@contextmanager
+def connection_mode(name):
+    """
+    Временно подменяет соединение default соединением в режиме name.
+    На PostgreSQL бэкенд выбирается, как в settings.py: свой только
+    для пула, иначе стандартный.
+    """
+    previous = connections[DEFAULT_DB_ALIAS]
+    previous.close()
+    settings_dict = {**previous.settings_dict, **CONNECTION_MODES[name]}
+    if previous.vendor == 'postgresql':
+        settings_dict['ENGINE'] = (
+            POOL_ENGINE if settings_dict['POOL'] else POSTGRESQL_ENGINE
+        )
+    connections[DEFAULT_DB_ALIAS] = load_backend(
+        settings_dict['ENGINE']
+    ).DatabaseWrapper(settings_dict, DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        connections[DEFAULT_DB_ALIAS].close()
+        drain_pools()
+        connections[DEFAULT_DB_ALIAS] = previous
+
+
+def wsgi_get(handler, path, query_string, token):
+    """
+    GET через WSGIHandler, как под gunicorn: request_started и
+    request_finished закрывают соединение по правилам режима.
+    """
+    response = handler({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_AUTHORIZATION': f'Token {token}',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }, lambda status, headers, exc_info=None: None)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return response
+
+
+def measure(handler, tokens, iterations, rng):
+    """Время запросов ленты и число физических подключений за прогон."""
+    connects = []
+
+    def count_connect(**kwargs):
+        connects.append(1)
+
+    connection_created.connect(count_connect)
+    pooled = sum(pool.opened for pool in pools.values())
+    timings = []
+    try:
+        for _ in range(iterations):
+            start = perf_counter()
+            response = wsgi_get(handler, *RECIPE_LIST, rng.choice(tokens))
+            timings.append(perf_counter() - start)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{RECIPE_LIST[0]} ответил {response.status_code}'
+                )
+    finally:
+        connection_created.disconnect(count_connect)
+    if connection.settings_dict.get('POOL'):
+        return timings, sum(pool.opened for pool in pools.values()) - pooled
+    return timings, len(connects)
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Сравнивает задержку ленты рецептов без повторного использования '
+        'соединений, с CONN_MAX_AGE и с пулом: запросы идут через '
+        'WSGIHandler, как под gunicorn'
+    )
+
+    def run(self, options):
+        user_ids, _ = seed_dataset(
+            users=options['users'], recipes=options['recipes'],
+            ingredients=options['ingredients'], seed=options['seed'],
+        )
+        tokens = [
+            Token.objects.get_or_create(user=user)[0].key
+            for user in User.objects.filter(id__in=user_ids[:50])
+        ]
+        postgresql = connection.vendor == 'postgresql'
+        if not postgresql:
+            self.stdout.write(self.style.WARNING(
+                'Соединение с тестовой SQLite в памяти не закрывается, '
+                'сравнение режимов имеет смысл только на PostgreSQL'
+            ))
+        handler = WSGIHandler()
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f'{"режим":<12}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"подключений":>14}'
+        )
+        opened = {}
+        for name in CONNECTION_MODES:
+            with connection_mode(name):
+                timings, opened[name] = measure(
+                    handler, tokens, options['iterations'], rng
+                )
+            self.stdout.write(
+                f'{name:<12}'
+                f'{percentile(timings, 50) * 1000:>10.1f}'
+                f'{percentile(timings, 95) * 1000:>10.1f}'
+                f'{opened[name]:>14}'
+            )
+        if postgresql and not (
+            opened['none'] > opened['persistent']
+            and opened['none'] > opened['pool']
+        ):
+            raise CommandError(
+                f'Режимы открыли одинаково соединений: {opened}'
+            )
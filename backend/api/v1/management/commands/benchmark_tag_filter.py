@@ -0,0 +1,73 @@
+from time import perf_counter
+
+from recipes.models import Recipe, Tag
+from recipes.seeding import seed_dataset
+
+from ...filters import RecipeFilter
+from .benchmark_api import Command as BenchmarkCommand
+from .benchmark_api import percentile
+
+
+def join_distinct(slugs, mode):
+    """Прежний фильтр: JOIN по tags__slug и DISTINCT от дублей."""
+    return Recipe.objects.filter(tags__slug__in=slugs).distinct()
+
+
+def exists_filter(slugs, mode):
+    return RecipeFilter(
+        {'tags': slugs, 'tags_mode': mode}, queryset=Recipe.objects.all()
+    ).qs
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Сравнивает фильтр по тегам через JOIN + DISTINCT и через EXISTS '
+        'на синтетических данных во временной тестовой БД'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(recipes=100000, iterations=20)
+
+    def run(self, options):
+        started = perf_counter()
+        seed_dataset(
+            users=options['users'], recipes=options['recipes'],
+            ingredients=options['ingredients'], ingredients_per_recipe=1,
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f'Данные: {options["recipes"]} рецептов, '
+            f'{perf_counter() - started:.1f} с на заполнение\n'
+        )
+        slugs = list(Tag.objects.values_list('slug', flat=True))
+        self.stdout.write(
+            f'{"фильтр":<30}{"p50, мс":>10}{"p95, мс":>10}{"рецептов":>10}'
+        )
+        for size in range(1, len(slugs) + 1):
+            selected = slugs[:size]
+            self.measure(
+                f'join + distinct x{size}', join_distinct, selected,
+                'any', options['iterations']
+            )
+            for mode in ('any', 'all'):
+                self.measure(
+                    f'exists {mode} x{size}', exists_filter, selected,
+                    mode, options['iterations']
+                )
+
+    def measure(self, name, build, slugs, mode, iterations):
+        """Первая страница ленты и COUNT, как в RecipePaginator."""
+        timings = []
+        for _ in range(iterations):
+            start = perf_counter()
+            queryset = build(slugs, mode).order_by('-created', '-id')
+            total = queryset.count()
+            list(queryset[:6])
+            timings.append(perf_counter() - start)
+        self.stdout.write(
+            f'{name:<30}'
+            f'{percentile(timings, 50) * 1000:>10.1f}'
+            f'{percentile(timings, 95) * 1000:>10.1f}'
+            f'{total:>10}'
+        )
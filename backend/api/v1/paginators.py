@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram_backend.settings import PAGE_SIZE
 
@@ -6,3 +13,94 @@ from foodgram_backend.settings import PAGE_SIZE
 class RecipePaginator(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = PAGE_SIZE
+
+
+class RecipeCursorPaginator(BasePagination):
+    """
+    Keyset-пагинация ленты по (created, id) без COUNT(*) и OFFSET.
+
+    Курсор хранит ключ крайнего рецепта страницы, следующая страница
+    читается условием (created, id) < (c, i) по составному индексу,
+    поэтому стоимость страницы не зависит от глубины прокрутки.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[0]
+
+        if cursor is None:
+            queryset = queryset.order_by('-created', '-id')
+        elif reverse:
+            created, pk = cursor[1:]
+            queryset = queryset.filter(
+                Q(created__gt=created) | Q(created=created, id__gt=pk)
+            ).order_by('created', 'id')
+        else:
+            created, pk = cursor[1:]
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id__lt=pk)
+            ).order_by('-created', '-id')
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = has_more if reverse else cursor is not None
+        self.next_recipe = results[-1] if results and has_next else None
+        self.previous_recipe = (
+            results[0] if results and has_previous else None
+        )
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            reverse, created, pk = urlsafe_b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            return reverse == 'r', date.fromisoformat(created), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, recipe, reverse):
+        position = f"{'r' if reverse else 'f'}|{recipe.created}|{recipe.pk}"
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+        )
+
+    def get_next_link(self):
+        if self.next_recipe is None:
+            return None
+        return self.encode_cursor(self.next_recipe, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_recipe is None:
+            return None
+        return self.encode_cursor(self.previous_recipe, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
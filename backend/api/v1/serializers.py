@@ -1,16 +1,24 @@
+from collections import defaultdict
+
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers, status
 
 from foodgram_backend.constants import (MAX_INGREDIENT_AMOUNT,
                                         MAX_REGISTRATION_LENGTH,
-                                        MIN_INGREDIENT_AMOUNT)
+                                        MIN_INGREDIENT_AMOUNT,
+                                        RECIPE_BULK_MAX_SIZE)
+from foodgram_backend.db import delete_pks
 from recipes.models import (BuyList, Favorite, Ingredient, Recipe,
                             RecipeIngredient, RecipeTag, Tag)
+from recipes.shopping import apply_recipe_deltas
 from users.models import Follow, User
 
-from .fields import Base64ImageField
+from .fields import (Base64ImageField, ImageRenditionsField,
+                     PrimaryKeyListField)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -49,6 +57,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.username = validated_data.get('username', instance.username)
         instance.email = validated_data.get('email', instance.email)
@@ -59,6 +68,8 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             user = request.user
@@ -184,6 +195,12 @@ class BuyListSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount', 'name')
 
 
+class ShoppingListTotalSerializer(serializers.Serializer):
+    name = serializers.CharField(source='ingredient_name')
+    measurement_unit = serializers.CharField(source='unit')
+    amount = serializers.IntegerField(source='total')
+
+
 class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -198,9 +215,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class WriteIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source='ingredient'
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENT_AMOUNT, max_value=MAX_INGREDIENT_AMOUNT
     )
@@ -252,34 +267,27 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True, )
     image = Base64ImageField(max_length=None)
+    images = ImageRenditionsField()
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'name', 'image', 'tags', 'ingredients',
+            'id', 'name', 'image', 'images', 'tags', 'ingredients',
             'author', 'text', 'cooking_time',
             'is_favorited', 'is_in_shopping_cart'
         )
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return not user.is_anonymous and Favorite.objects.filter(
-            recipe=obj, user=user
-        ).exists()
+        return getattr(obj, 'is_favorited', False)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return BuyList.objects.filter(
-            recipe=obj, user=user
-        ).exists()
+        return getattr(obj, 'is_in_shopping_cart', False)
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     ingredients = WriteIngredientSerializer(
         many=True, source='recipeingredient_set'
     )
@@ -321,31 +329,85 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    def replace_ingredients(self, recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к ingredients_data тремя запросами:
+        удаление, вставка и обновление только изменившихся строк.
+        Разница переносится в списки покупок одним запросом.
+        """
+        amounts = {
+            ingredient_data['ingredient'].id: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        existing = {}
+        to_delete = []
+        to_update = []
+        deltas = defaultdict(int)
+        for recipe_ingredient in recipe.recipeingredient_set.all():
+            ingredient_id = recipe_ingredient.ingredient_id
+            if ingredient_id not in amounts or ingredient_id in existing:
+                to_delete.append(recipe_ingredient.id)
+                deltas[ingredient_id] -= recipe_ingredient.amount
+                continue
+            existing[ingredient_id] = recipe_ingredient
+            if recipe_ingredient.amount != amounts[ingredient_id]:
+                deltas[ingredient_id] += (
+                    amounts[ingredient_id] - recipe_ingredient.amount
+                )
+                recipe_ingredient.amount = amounts[ingredient_id]
+                to_update.append(recipe_ingredient)
+
+        # Без сигналов по строкам: изменения учтены в deltas,
+        # кэш и поиск обновятся по post_save рецепта.
+        delete_pks(RecipeIngredient, to_delete)
+        new_ingredients = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        RecipeIngredient.objects.bulk_create(new_ingredients)
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        for recipe_ingredient in new_ingredients:
+            deltas[recipe_ingredient.ingredient_id] += recipe_ingredient.amount
+        apply_recipe_deltas(recipe.id, deltas)
+
+    @transaction.atomic
     def create(self, validated_data):
         self.validate_required_fields(
             validated_data,
             ['tags', 'cooking_time', 'image', 'recipeingredient_set']
         )
 
-        tags_data = validated_data.pop('tags')
+        tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('recipeingredient_set')
 
         recipe = Recipe.objects.create(
             **validated_data, author=self.context['request'].user
         )
 
-        tags = [Tag.objects.get(name=tag_data) for tag_data in tags_data]
         self.create_ingredients(recipe, ingredients_data)
-        recipe.tags.set(tags, clear=True)
+        recipe.tags.set(tags)
 
         return recipe
 
     def to_representation(self, instance):
+        user = self.context['request'].user
+        if hasattr(instance, 'is_favorited'):
+            # Рецепт из get_object: флаги и автор уже загружены,
+            # перечитываются только связи, которые сбросил update().
+            prefetch_related_objects(
+                [instance], *Recipe.objects.read_prefetches(user)
+            )
+        else:
+            instance = Recipe.objects.for_read(user).get(pk=instance.pk)
         representation = RecipeReadSerializer(
             instance, context=self.context
         ).data
         return representation
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         self.validate_required_fields(
             validated_data,
@@ -357,14 +419,20 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
+        image = validated_data.get('image', instance.image)
+        if image != instance.image:
+            instance.image = image
+            instance.renditions_ready = False
 
         ingredients_data = validated_data.pop('recipeingredient_set', [])
-        self.create_ingredients(instance, ingredients_data)
-
-        tags_data = validated_data.get('tags', [])
-        tags = [Tag.objects.get(name=tag_data) for tag_data in tags_data]
+        self.replace_ingredients(instance, ingredients_data)
+        # Ингредиенты изменены в обход менеджера связи, поэтому
+        # загруженные get_object строки сбрасываются вручную.
+        getattr(instance, '_prefetched_objects_cache', {}).pop(
+            'recipeingredient_set', None
+        )
 
-        instance.tags.set(tags, clear=True)
+        instance.tags.set(validated_data.get('tags', []))
 
         instance.save()
         return instance
@@ -380,7 +448,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         try:
             ingredient_ids = [
-                ingredient['ingredient'] for ingredient in ingredients
+                ingredient['id'] for ingredient in ingredients
             ]
         except TypeError:
             raise serializers.ValidationError(
@@ -392,7 +460,21 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 "Дубликаты ингредиентов не допускаются.", code='invalid'
             )
 
-        return ingredients
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            if ingredient_id not in found:
+                raise serializers.ValidationError(
+                    f"Ингредиент с id {ingredient_id} не существует.",
+                    code='invalid'
+                )
+
+        return [
+            {
+                'ingredient': found[ingredient['id']],
+                'amount': ingredient['amount'],
+            }
+            for ingredient in ingredients
+        ]
 
     def validate_tags(self, tags):
         if tags is None:
@@ -422,10 +504,23 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image', 'name', 'cooking_time')
+        fields = ('id', 'image', 'images', 'name', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BULK_MAX_SIZE,
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
 
 
 class SubscribeSerializer(UserSerializer):
@@ -442,11 +537,6 @@ class SubscribeSerializer(UserSerializer):
     def validate(self, data):
         following = self.instance
         user = self.context.get('request').user
-        if Follow.objects.filter(following=following, user=user).exists():
-            raise ValidationError(
-                {"error": "Вы уже подписаны на этого пользователя!"},
-                code=status.HTTP_400_BAD_REQUEST
-            )
         if user == following:
             raise ValidationError(
                 {"error": "Вы не можете подписаться на самого себя!"},
@@ -454,20 +544,18 @@ class SubscribeSerializer(UserSerializer):
             )
         return data
 
-    def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return Follow.objects.filter(user=user, following=obj).exists()
-
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            limit = request.GET.get('recipes_limit')
+            recipes = obj.recipes.all()
+            if limit:
+                recipes = recipes[:int(limit)]
         serializer = RecipeShortSerializer(
             recipes, many=True, read_only=True,
             context={'request': request}
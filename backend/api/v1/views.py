@@ -1,12 +1,14 @@
 from collections import defaultdict
+from functools import partial
 
 from django.contrib.auth.hashers import check_password
-from django.db.models import Count
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.pagination import (LimitOffsetPagination,
                                        PageNumberPagination)
 from rest_framework.permissions import (SAFE_METHODS, AllowAny,
@@ -16,24 +18,30 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from foodgram_backend.db import (bulk_delete_returning, bulk_insert_returning,
+                                 delete_returning, insert_ignore)
 from recipes.models import (BuyList, Favorite, Ingredient, Recipe,
-                            RecipeIngredient, Tag)
+                            ShoppingListItem, Tag)
+from recipes.shopping import add_recipes
 from users.models import Follow, User
+from users.signals import recount_counter
 
+from .cache import ingredients_cache, recipe_detail_cache, tags_cache
+from .conditional import conditional_response
+from .exporters import SHOPPING_LIST_EXPORTERS, shopping_list_rows
 from .filters import IngredientFilter, RecipeFilter
-from .paginators import RecipePaginator
+from .paginators import RecipeCursorPaginator, RecipePaginator
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (BuyListSerializer, FavoriteSerializer,
                           FollowSerializer, IngredientSerializer,
-                          RecipeReadSerializer, RecipeShortSerializer,
-                          RecipeWriteSerializer, SubscribeSerializer,
+                          RecipeIdsSerializer, RecipeReadSerializer,
+                          RecipeShortSerializer, RecipeWriteSerializer,
+                          ShoppingListTotalSerializer, SubscribeSerializer,
                           TagSerializer, UserRegistrationSerializer,
                           UserSerializer)
 
 
 def post_method(request, recipe_id, model, model_serializer):
-    user = request.user
-
     try:
         recipe = Recipe.objects.get(pk=recipe_id)
     except Recipe.DoesNotExist:
@@ -42,35 +50,76 @@ def post_method(request, recipe_id, model, model_serializer):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    if model.objects.filter(user=user, recipe=recipe).exists():
+    created = insert_ignore(
+        model, user_id=request.user.id, recipe_id=recipe.id
+    )
+    if created is None:
         return Response(
             {'errors': 'Рецепт уже в списке покупок или в избранном'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    model.objects.create(user=user, recipe=recipe)
 
     serializer = model_serializer(recipe)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 def delete_method(request, recipe_id, model):
-    user = request.user
-    try:
-        recipe = Recipe.objects.get(pk=recipe_id)
-    except Recipe.DoesNotExist:
-        return Response(
-            {'errors': 'Рецепт не существует'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    favorite = model.objects.filter(user=user, recipe=recipe)
-    if favorite.exists():
-        favorite.delete()
+    if delete_returning(model, user_id=request.user.id, recipe_id=recipe_id):
         return Response(status=status.HTTP_204_NO_CONTENT)
-    else:
+    if not Recipe.objects.filter(pk=recipe_id).exists():
         return Response(
-            {'errors': 'Рецепт не найден'},
+            {'errors': 'Рецепт не существует'},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response(
+        {'errors': 'Рецепт не найден'},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+def bulk_method(request, model, counter_field):
+    """
+    POST добавляет, DELETE убирает рецепты из списка model пачкой:
+    один INSERT ... ON CONFLICT DO NOTHING или один DELETE с RETURNING,
+    затем один UPDATE счётчиков. Статус по каждому id берётся из строк,
+    которые запрос действительно вставил или удалил.
+    """
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipe_ids = serializer.validated_data['recipes']
+    user = request.user
+
+    with transaction.atomic():
+        if request.method == 'POST':
+            found = set(Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).order_by().values_list('pk', flat=True))
+            changed = set(bulk_insert_returning(
+                model,
+                ({'user_id': user.id, 'recipe_id': recipe_id}
+                 for recipe_id in found),
+                'recipe_id'
+            ))
+            statuses = {recipe_id: 'exists' for recipe_id in found}
+            statuses.update({recipe_id: 'added' for recipe_id in changed})
+            sign = 1
+        else:
+            changed = set(bulk_delete_returning(
+                model, 'recipe_id', user_id=user.id, recipe_id=recipe_ids
+            ))
+            statuses = {recipe_id: 'removed' for recipe_id in changed}
+            sign = -1
+
+        # Сигналы по строкам не отправлялись: счётчики и список покупок
+        # обновляются здесь только для изменившихся рецептов.
+        if changed:
+            recount_counter(Recipe, changed, counter_field, model, 'recipe')
+            if model is BuyList:
+                add_recipes(user.id, changed, sign)
+    return Response({'results': [
+        {'id': recipe_id, 'status': statuses.get(recipe_id, 'not_found')}
+        for recipe_id in recipe_ids
+    ]})
 
 
 class TagViewSet(ReadOnlyModelViewSet):
@@ -78,6 +127,10 @@ class TagViewSet(ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    def list(self, request, *args, **kwargs):
+        return tags_cache.response(request)
 
 
 class UserViewSet(ModelViewSet):
@@ -85,6 +138,7 @@ class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = LimitOffsetPagination
+    query_budget = {'subscriptions': 4}
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -140,20 +194,23 @@ class UserViewSet(ModelViewSet):
                 following, data=request.data, context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            Follow.objects.create(user=user, following=following)
+            if insert_ignore(
+                Follow, user_id=user.id, following_id=following.id
+            ) is None:
+                return Response(
+                    {'error': 'Вы уже подписаны на этого пользователя!'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            try:
-                subscription = Follow.objects.get(
-                    user=user, following=following
-                )
-            except Follow.DoesNotExist:
+            if delete_returning(
+                Follow, user_id=user.id, following_id=following.id
+            ) is None:
                 return Response(
                     {'errors': 'Пользователь не найден'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            subscription.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -164,11 +221,21 @@ class UserViewSet(ModelViewSet):
         user = request.user
         queryset = (User.objects
                     .filter(following__user=user)
-                    .annotate(recipes_count=Count('recipes')))
+                    .with_is_subscribed(user)
+                    .order_by('id'))
         limit = request.query_params.get('limit', None)
         if limit is not None:
             self.paginator.default_limit = int(limit)
         pages = self.paginate_queryset(queryset)
+
+        recipes_limit = request.query_params.get('recipes_limit')
+        recipes_limit = int(recipes_limit) if recipes_limit else None
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.top_per_author(pages, recipes_limit):
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in pages:
+            author.limited_recipes = recipes_by_author[author.id]
+
         serializer = SubscribeSerializer(pages,
                                          many=True,
                                          context={'request': request})
@@ -208,6 +275,12 @@ class IngredientAPIView(ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return ingredients_cache.response(request)
+        return super().list(request, *args, **kwargs)
 
 
 # СПИСОК ПОКУПОК
@@ -230,51 +303,94 @@ class BuyListAPIView(APIView):
 
 
 # ЛИСТ ПОКУПОК
+class ShoppingCartContentNegotiation(DefaultContentNegotiation):
+    """?format= выбирает формат файла, а не рендерер DRF."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
 class DownloadShoppingCartAPIView(APIView):
+    content_negotiation_class = ShoppingCartContentNegotiation
 
     def get(self, request):
-        user = request.user
-        shopping_cart = BuyList.objects.filter(
-            user=user
-        ).select_related('recipe')
-        ingredients_sum = defaultdict(lambda: {'amount': 0, 'unit': ''})
-
-        for item in shopping_cart:
-            recipe_ingredients = RecipeIngredient.objects.filter(
-                recipe=item.recipe
-            ).select_related('ingredient')
-
-            for ingredient in recipe_ingredients:
-                ingredient_info = ingredients_sum[ingredient.ingredient.name]
-                ingredient_info['amount'] += ingredient.amount
-                ingredient_info[
-                    'unit'
-                ] = ingredient.ingredient.measurement_unit
-
-        filename = "shopping_list.txt"
-        content = "\n".join(
-            [f"{name}: {details['amount']}{details['unit']}" for name,
-             details in ingredients_sum.items()]
-        )
-
-        response = HttpResponse(content, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_EXPORTERS:
+            return Response(
+                {'errors': 'Неподдерживаемый формат файла'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        exporter, content_type = SHOPPING_LIST_EXPORTERS[file_format]
 
+        response = StreamingHttpResponse(
+            exporter(shopping_list_rows(request.user)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=shopping_list.{file_format}'
+        )
         return response
 
 
 class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly]
     pagination_class = RecipePaginator
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    lookup_value_regex = r'\d+'
+    query_budget = {
+        'list': 8, 'retrieve': 8, 'feed': 7,
+        'shopping_cart_bulk': 8, 'favorite_bulk': 6,
+        'shopping_cart_summary': 2,
+    }
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @property
+    def paginator(self):
+        """?cursor= включает keyset-пагинацию вместо ?page=."""
+        if not hasattr(self, '_paginator'):
+            if 'cursor' in self.request.query_params:
+                self._paginator = RecipeCursorPaginator()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        return Recipe.objects.for_read(self.request.user)
+
+    def paginated_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return conditional_response(
+            request, queryset, partial(self.paginated_response, queryset)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            self.get_queryset().filter(pk=kwargs[self.lookup_field]),
+            partial(
+                recipe_detail_cache.response,
+                request, kwargs[self.lookup_field]
+            ),
+            pk=kwargs[self.lookup_field]
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        return self.paginated_response(
+            self.filter_queryset(self.get_queryset()).feed(request.user)
+        )
+
     def get_filterset_kwargs(self):
         return {
             'data': self.request.GET,
@@ -307,3 +423,32 @@ class RecipeViewSet(ModelViewSet):
     def delete_shopping_cart(self, request, pk=None):
         response = delete_method(request, pk, BuyList)
         return response
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart/bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return bulk_method(request, BuyList, 'shopping_cart_count')
+
+    @action(
+        detail=False,
+        url_path='shopping_cart/summary',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_summary(self, request):
+        """Список покупок в JSON одним чтением ShoppingListItem."""
+        return Response(ShoppingListTotalSerializer(
+            ShoppingListItem.objects.totals(request.user), many=True
+        ).data)
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='favorite/bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return bulk_method(request, Favorite, 'favorites_count')
@@ -8,3 +8,23 @@ MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 10000
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 480
+SHOPPING_LIST_CHUNK_SIZE = 2000
+SHOPPING_LIST_PDF_FONT_SIZE = 12
+SHOPPING_LIST_PDF_MARGIN = 50
+INGREDIENT_AUTOCOMPLETE_LIMIT = 50
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+INGREDIENT_LOAD_BATCH_SIZE = 1000
+SEED_BATCH_SIZE = 2000
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 20
+RECIPE_DETAIL_CACHE_TIMEOUT = 60 * 60
+RECIPE_SEARCH_CONFIG = 'russian'
+RECIPE_BULK_MAX_SIZE = 100
+SHOPPING_LIST_CHECK_BATCH_SIZE = 500
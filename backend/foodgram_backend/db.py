@@ -0,0 +1,157 @@
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+
+
+def returning_statement(model, template, values):
+    """Выполняет SQL с RETURNING pk и отдаёт объект или None."""
+    meta = model._meta
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    fields = {field.attname: field for field in meta.concrete_fields}
+    columns = [quote(fields[name].column) for name in values]
+    params = [
+        fields[name].get_db_prep_save(value, connection)
+        for name, value in values.items()
+    ]
+    sql = template.format(
+        table=quote(meta.db_table),
+        columns=', '.join(columns),
+        placeholders=', '.join(['%s'] * len(columns)),
+        where=' AND '.join(f'{column} = %s' for column in columns),
+        pk=quote(meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None, using
+    instance = model(pk=row[0], **values)
+    instance._state.adding = False
+    instance._state.db = using
+    return instance, using
+
+
+def insert_ignore(model, **values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING pk одним запросом:
+    уникальное ограничение решает гонку параллельных запросов.
+    Возвращает созданный объект или None, если строка уже была.
+    """
+    instance, using = returning_statement(
+        model,
+        'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+        'ON CONFLICT DO NOTHING RETURNING {pk}',
+        values
+    )
+    if instance is not None:
+        post_save.send(
+            sender=model, instance=instance, created=True,
+            update_fields=None, raw=False, using=using
+        )
+    return instance
+
+
+def delete_returning(model, **values):
+    """
+    DELETE ... RETURNING pk одним запросом. Возвращает удалённый
+    объект или None, если удалять было нечего.
+    """
+    instance, using = returning_statement(
+        model, 'DELETE FROM {table} WHERE {where} RETURNING {pk}', values
+    )
+    if instance is not None:
+        post_delete.send(sender=model, instance=instance, using=using)
+    return instance
+
+
+def delete_pks(model, pks):
+    """
+    DELETE ... WHERE pk IN (...) одним запросом, без сбора объектов
+    и сигналов: работу получателей post_delete делает вызывающий.
+    """
+    pks = list(pks)
+    if not pks:
+        return 0
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.pk.column)} IN '
+            f'({", ".join(["%s"] * len(pks))})',
+            pks
+        )
+        return cursor.rowcount
+
+
+def bulk_insert_returning(model, rows, returning):
+    """
+    Многострочный INSERT ... ON CONFLICT DO NOTHING RETURNING одним
+    запросом, без сигналов. Отдаёт значения поля returning только
+    у действительно вставленных строк: уже существующие пропускаются.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    names = list(rows[0])
+    fields = [meta.get_field(name) for name in names]
+    placeholders = f'({", ".join(["%s"] * len(fields))})'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES {", ".join([placeholders] * len(rows))} '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(meta.get_field(returning).column)}',
+            [
+                field.get_db_prep_save(row[name], connection)
+                for row in rows for name, field in zip(names, fields)
+            ]
+        )
+        return [value for value, in cursor.fetchall()]
+
+
+def bulk_delete_returning(model, returning, **filters):
+    """
+    DELETE ... WHERE ... RETURNING одним запросом, без сигналов.
+    filters — {поле: значение} или {поле: набор значений} для IN.
+    Отдаёт значения поля returning у удалённых строк.
+    """
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    conditions = []
+    params = []
+    for name, value in filters.items():
+        field = meta.get_field(name)
+        values = value if isinstance(value, (list, set, tuple)) else [value]
+        if not values:
+            return []
+        conditions.append(
+            f'{quote(field.column)} IN ({", ".join(["%s"] * len(values))})'
+        )
+        params.extend(
+            field.get_db_prep_value(item, connection) for item in values
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {" AND ".join(conditions)} '
+            f'RETURNING {quote(meta.get_field(returning).column)}',
+            params
+        )
+        return [value for value, in cursor.fetchall()]
+
+
+def sqlite_unicode_lower(sender, connection, **kwargs):
+    """Встроенный LOWER() в SQLite не приводит кириллицу к нижнему регистру."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'LOWER', 1, lambda value: value and value.lower(),
+            deterministic=True
+        )
@@ -0,0 +1,194 @@
+import json
+import logging
+from collections import Counter
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('foodgram.requests')
+
+
+class QueryBudgetExceeded(Exception):
+    """Эндпоинт выполнил больше запросов, чем объявлено в query_budget."""
+
+
+class QueryCollector:
+    """execute_wrapper: запоминает каждый SQL-запрос и его длительность."""
+
+    def __init__(self):
+        self.statements = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.statements.append((sql, repr(params)))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self):
+        """Повторы одного SQL с разными параметрами — признак N+1."""
+        counts = Counter(sql for sql, params in self.statements)
+        return {sql: total for sql, total in counts.items() if total > 1}
+
+    def duplicates(self):
+        """Полностью одинаковые запросы: тот же SQL и те же параметры."""
+        counts = Counter(self.statements)
+        return sum(total - 1 for total in counts.values())
+
+
+def timed_serializer_data(data):
+    """
+    Свойство data сериализаторов DRF, которое копит в request.serialize_time
+    время сериализации без SQL внутри неё. Вложенный вызов data (сериализатор
+    ответа внутри другого) повторно не считается.
+    """
+
+    @wraps(data.fget)
+    def fget(serializer):
+        request = serializer.context.get('request')
+        # Атрибуты пишутся в HttpRequest, который видит middleware.
+        request = getattr(request, '_request', request)
+        collector = getattr(request, 'sql_collector', None)
+        if collector is None or request.serializing:
+            return data.fget(serializer)
+        request.serializing = True
+        db_before = collector.duration
+        start = perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            request.serialize_time += (
+                perf_counter() - start - (collector.duration - db_before)
+            )
+            request.serializing = False
+
+    fget.timed = True
+    return property(fget)
+
+
+def instrument_serializers():
+    """
+    Подменяет BaseSerializer.data один раз на процесс и только при
+    включённом инструментировании: без него сериализаторы не меняются.
+    """
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = timed_serializer_data(BaseSerializer.data)
+
+
+def get_query_budget(view_func, request):
+    """
+    query_budget у класса представления: число или словарь
+    {action: число} для ViewSet.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(
+        view_func, 'view_class', None
+    )
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        budget = budget.get(action)
+    return budget
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Число и время SQL-запросов, повторы, время сериализации
+    (instrument_serializers) и рендеринга ответа для каждого
+    представления: заголовок Server-Timing и JSON-строка
+    в логе foodgram.requests. Включается SQL_INSTRUMENTATION; при
+    SQL_INSTRUMENTATION_STRICT превышение query_budget представления
+    поднимает QueryBudgetExceeded, что роняет тест.
+
+    Запросы, выполненные при отдаче StreamingHttpResponse, происходят
+    уже после middleware и не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        instrument_serializers()
+        self.get_response = get_response
+        self.strict = settings.SQL_INSTRUMENTATION_STRICT
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        request.query_budget = None
+        request.view_name = None
+        request.render_time = 0.0
+        request.serialize_time = 0.0
+        request.serializing = False
+        request.sql_collector = collector
+        start = perf_counter()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        total = perf_counter() - start
+
+        db_time = collector.duration
+        serialize_time = request.serialize_time
+        app_time = max(
+            total - db_time - serialize_time - request.render_time, 0.0
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={db_time * 1000:.1f};desc="{collector.count} queries"',
+            f'app;dur={app_time * 1000:.1f}',
+            f'serialize;dur={serialize_time * 1000:.1f}',
+            f'render;dur={request.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+        repeated = collector.repeated()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': request.view_name,
+            'status': response.status_code,
+            'queries': collector.count,
+            'duplicates': collector.duplicates(),
+            'repeated': max(repeated.values(), default=0),
+            'db_ms': round(db_time * 1000, 2),
+            'app_ms': round(app_time * 1000, 2),
+            'serialize_ms': round(serialize_time * 1000, 2),
+            'render_ms': round(request.render_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'query_budget': request.query_budget,
+        }, ensure_ascii=False))
+        if repeated:
+            logger.warning(
+                'Возможный N+1 в %s: %s',
+                request.view_name,
+                '; '.join(
+                    f'{total}x {sql[:200]}' for sql, total in repeated.items()
+                )
+            )
+
+        budget = request.query_budget
+        if self.strict and budget is not None and collector.count > budget:
+            raise QueryBudgetExceeded(
+                f'{request.view_name}: {collector.count} запросов '
+                f'при бюджете {budget}'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_name = f'{view_func.__module__}.{view_func.__name__}'
+        request.query_budget = get_query_budget(view_func, request)
+
+    def process_template_response(self, request, response):
+        started = perf_counter()
+
+        def finish_render(rendered):
+            request.render_time = perf_counter() - started
+
+        response.add_post_render_callback(finish_render)
+        return response
@@ -0,0 +1,203 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.db.backends.postgresql import base, creation
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 в процессе воркера: одновременно открыто
+    не больше size соединений, свободные ждут следующего запроса.
+    """
+
+    def __init__(self, size, timeout, max_age):
+        self.timeout = timeout
+        self.max_age = max_age
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def acquire(self, connect, health_check):
+        """
+        Отдаёт (соединение, время открытия, новое ли оно). Если все
+        соединения заняты, ждёт timeout секунд и поднимает OperationalError.
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Пул соединений исчерпан: ожидание дольше {self.timeout} с'
+            )
+        try:
+            while True:
+                try:
+                    connection, opened_at = self.idle.get_nowait()
+                except queue.Empty:
+                    connection = connect()
+                    self.opened += 1
+                    return connection, time.monotonic(), True
+                if self.usable(connection, opened_at, health_check):
+                    return connection, opened_at, False
+                self.discard(connection)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def usable(self, connection, opened_at, health_check):
+        if connection.closed:
+            return False
+        if (
+            self.max_age is not None
+            and time.monotonic() - opened_at >= self.max_age
+        ):
+            return False
+        if not health_check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def release(self, connection, opened_at, reusable):
+        """Возвращает соединение в пул; сломанное или устаревшее закрывает."""
+        try:
+            if reusable and not connection.closed:
+                status = connection.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    reusable = False
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            if reusable and (
+                self.max_age is None
+                or time.monotonic() - opened_at < self.max_age
+            ):
+                self.idle.put((connection, opened_at))
+            else:
+                self.discard(connection)
+        except base.Database.Error:
+            self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except base.Database.Error:
+            logger.warning('Не удалось закрыть соединение из пула')
+
+    def drain(self):
+        """Закрывает свободные соединения, занятые не трогает."""
+        while True:
+            try:
+                connection, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(connection)
+
+
+def get_pool(options, conn_params):
+    """
+    Пулы отдельные для каждого набора параметров подключения и процесса:
+    после fork воркер gunicorn не делит соединения с мастером.
+    """
+    key = (os.getpid(), tuple(sorted(
+        (name, str(value)) for name, value in conn_params.items()
+    )))
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(
+                options['SIZE'], options['TIMEOUT'], options['MAX_AGE']
+            )
+        return pools[key]
+
+
+def drain_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.drain()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Свободные соединения пула с тестовой БД помешали бы DROP DATABASE.
+        drain_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с проверкой переиспользуемого соединения (HEALTH_CHECKS)
+    и пулом соединений на процесс (POOL). Без этих ключей в настройках
+    ведёт себя как стандартный бэкенд.
+    """
+
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool = None
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL')
+        self.health_check_done = True
+        if not options:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(options, conn_params)
+        connection, self.pool_opened_at, created = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            self.health_checks
+        )
+        self.pool = pool
+        if not created:
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level
+            )
+        return connection
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            pool.release(
+                self.connection, self.pool_opened_at,
+                # Закрытое посреди atomic() соединение Django ещё держит,
+                # поэтому в пул оно не возвращается.
+                reusable=not (self.errors_occurred or self.in_atomic_block)
+            )
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Вызывается в начале и в конце запроса: соединение, пережившее
+        # запрос, проверяется при первом обращении в следующем.
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.health_checks
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.middleware.SQLInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,17 +66,47 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+# none — соединение на запрос, persistent — CONN_MAX_AGE,
+# pool — пул соединений в каждом воркере.
+DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'none')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Пул и проверка соединений есть только в своём бэкенде, поэтому
+        # он подключается лишь при DB_CONN_MODE=pool.
+        'ENGINE': (
+            'foodgram_backend.postgresql' if DB_CONN_MODE == 'pool'
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'mysecretpassword'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            int(os.getenv('DB_CONN_MAX_AGE', 60))
+            if DB_CONN_MODE == 'persistent' else 0
+        ),
+        'HEALTH_CHECKS': (
+            DB_CONN_MODE == 'pool'
+            and os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', 8)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        } if DB_CONN_MODE == 'pool' else None,
     }
 }
 
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -132,3 +163,41 @@ REST_FRAMEWORK = {
 DJOSER = {
     'LOGIN_FIELD': 'email',
 }
+
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+
+FEED_FANOUT_WORKERS = int(os.getenv('FEED_FANOUT_WORKERS', 2))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'False') == 'True'
+SQL_INSTRUMENTATION_STRICT = (
+    os.getenv('SQL_INSTRUMENTATION_STRICT', 'False') == 'True'
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': 'INFO' if SQL_INSTRUMENTATION else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,23 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:9000')
+# Соединений с БД не больше GUNICORN_WORKERS * DB_POOL_SIZE.
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+# Потоки воркера делят его пул соединений.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+
+def on_starting(server):
+    """
+    Токены версий кэша тегов, ингредиентов и карточек рецептов живут
+    в кэше Django: в памяти процесса воркеры их не видят друг у друга.
+    """
+    backend = os.getenv(
+        'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+    )
+    if server.cfg.workers > 1 and backend.endswith('LocMemCache'):
+        raise RuntimeError(
+            'При GUNICORN_WORKERS > 1 нужен общий CACHE_BACKEND, '
+            'например memcached'
+        )
@@ -1,8 +1,7 @@
 from django.contrib import admin
-from django.db.models import Count
 
-from .models import (BuyList, Favorite, Ingredient, Recipe, RecipeIngredient,
-                     RecipeTag, Tag)
+from .models import (BuyList, Favorite, Ingredient, MeasurementUnit, Recipe,
+                     RecipeIngredient, RecipeTag, Tag)
 
 
 @admin.register(Tag)
@@ -17,6 +16,12 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+@admin.register(MeasurementUnit)
+class MeasurementUnitAdmin(admin.ModelAdmin):
+    list_display = ('name', 'base_unit', 'factor')
+    search_fields = ('name',)
+
+
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 0
@@ -38,16 +43,6 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author__username', 'tags__name')
     inlines = (RecipeIngredientInline, RecipeTagInLine)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorites_count=Count('favorites'))
-        return queryset
-
-    @admin.display(description='В избранном')
-    def favorites_count(self, obj):
-        return obj.favorites_count
-    favorites_count.admin_order_field = 'favorites_count'
-
     @admin.display(description='Ингредиенты')
     def ingredient_list(self, obj):
         return ", ".join(
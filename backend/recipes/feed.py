@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+from foodgram_backend.constants import (FEED_BACKFILL_SIZE,
+                                        FEED_FANOUT_BATCH_SIZE,
+                                        FEED_FANOUT_MAX_FOLLOWERS)
+from users.models import Follow, User
+
+from .models import FeedEntry, Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.FEED_FANOUT_WORKERS,
+    thread_name_prefix='feed'
+)
+
+
+def delivered_by_push(author_id):
+    """Авторам с большим числом подписчиков лента собирается при чтении."""
+    return User.objects.filter(
+        pk=author_id, followers_count__lt=FEED_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def fan_out(recipe_id):
+    """
+    Раскладывает новый рецепт по входящим подписчиков пачками и
+    помечает его разосланным. До пометки рецепт читается напрямую по
+    подпискам, так что в ленте он виден и во время рассылки.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('author').first()
+    if recipe is None or not delivered_by_push(recipe.author_id):
+        return
+    follower_ids = (
+        Follow.objects
+        .filter(following_id=recipe.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FEED_FANOUT_BATCH_SIZE)
+    )
+    while True:
+        batch = list(islice(follower_ids, FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, recipe_id=recipe_id)
+             for user_id in batch),
+            ignore_conflicts=True
+        )
+    Recipe.objects.filter(pk=recipe_id).update(pushed_to_feed=True)
+
+
+def backfill(user_id, author_id):
+    """
+    Новый подписчик получает последние разосланные рецепты автора;
+    неразосланные он и так читает по подписке.
+    """
+    recipe_ids = Recipe.objects.filter(
+        author_id=author_id, pushed_to_feed=True
+    ).values_list('id', flat=True)[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe_id)
+         for recipe_id in recipe_ids),
+        ignore_conflicts=True
+    )
+
+
+def run_feed_task(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception(
+            'Не удалось обновить ленту: %s%s', task.__name__, args
+        )
+    finally:
+        connection.close()
+
+
+def schedule_feed_task(task, *args):
+    """Ставит рассылку в фоновый пул: создание рецепта её не ждёт."""
+    executor.submit(run_feed_task, task, *args)
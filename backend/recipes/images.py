@@ -0,0 +1,80 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from foodgram_backend.constants import (IMAGE_RENDITION_QUALITY,
+                                        IMAGE_RENDITIONS)
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipes/renditions'
+RENDITION_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions'
+)
+image_locks = defaultdict(threading.Lock)
+
+
+def rendition_name(image_name, rendition, extension):
+    """
+    Имя уменьшенной копии выводится из имени оригинала, а оно —
+    из хэша содержимого, поэтому одинаковые картинки делят копии.
+    """
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{extension}'
+
+
+def generate_renditions(image_name):
+    """Создаёт недостающие копии и отмечает рецепты с этой картинкой."""
+    with default_storage.open(image_name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    for rendition, size in IMAGE_RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail(size)
+        for extension, image_format in RENDITION_FORMATS.items():
+            name = rendition_name(image_name, rendition, extension)
+            if default_storage.exists(name):
+                continue
+            if image_format == 'JPEG' and resized.mode != 'RGB':
+                output = resized.convert('RGB')
+            else:
+                output = resized
+            buffer = BytesIO()
+            output.save(
+                buffer, image_format,
+                quality=IMAGE_RENDITION_QUALITY, optimize=True
+            )
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    Recipe.objects.filter(image=image_name).update(
+        renditions_ready=True, updated_at=timezone.now()
+    )
+
+
+def run_generate_renditions(image_name):
+    try:
+        with image_locks[image_name]:
+            generate_renditions(image_name)
+    except Exception:
+        logger.exception('Не удалось создать копии %s', image_name)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(image_name):
+    """Ставит генерацию копий в фоновый пул, не задерживая запрос."""
+    executor.submit(run_generate_renditions, image_name)
@@ -0,0 +1,81 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from foodgram_backend.constants import SHOPPING_LIST_CHECK_BATCH_SIZE
+from recipes.models import BuyList, RecipeIngredient, ShoppingListItem
+from recipes.shopping import rebuild
+
+
+def expected_amounts(user_ids):
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in (
+            RecipeIngredient.objects
+            .filter(recipe__shopping_list__user__in=user_ids)
+            .values_list('recipe__shopping_list__user', 'ingredient')
+            .annotate(amount=Sum('amount'))
+            .order_by()
+        )
+    }
+
+
+def stored_amounts(user_ids):
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in (
+            ShoppingListItem.objects
+            .filter(user__in=user_ids)
+            .values_list('user', 'ingredient', 'amount')
+        )
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет ShoppingListItem с агрегатом BuyList x RecipeIngredient; '
+        'с --fix пересобирает расходящиеся списки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        user_ids = (
+            set(BuyList.objects.values_list('user', flat=True).distinct())
+            | set(ShoppingListItem.objects.values_list(
+                'user', flat=True
+            ).distinct())
+        )
+        user_ids = iter(sorted(user_ids))
+        broken = []
+        while True:
+            batch = list(islice(user_ids, SHOPPING_LIST_CHECK_BATCH_SIZE))
+            if not batch:
+                break
+            expected = expected_amounts(batch)
+            stored = stored_amounts(batch)
+            for key in expected.keys() | stored.keys():
+                if expected.get(key) != stored.get(key):
+                    user_id, ingredient_id = key
+                    broken.append(user_id)
+                    self.stdout.write(
+                        f'Пользователь {user_id}, ингредиент '
+                        f'{ingredient_id}: ожидается {expected.get(key)}, '
+                        f'в списке {stored.get(key)}'
+                    )
+        broken = sorted(set(broken))
+        if not broken:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        if not options['fix']:
+            raise CommandError(
+                f'Списки покупок расходятся у {len(broken)} пользователей'
+            )
+        with transaction.atomic():
+            rebuild(broken)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобраны списки {len(broken)} пользователей'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений, которых ещё нет'
+
+    def handle(self, *args, **options):
+        names = (
+            Recipe.objects
+            .filter(renditions_ready=False)
+            .exclude(image='')
+            .exclude(image__isnull=True)
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        for name in names:
+            generate_renditions(name)
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(f'Обработано: {len(names)}'))
@@ -0,0 +1,94 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.v1.cache import ingredients_cache
+from foodgram_backend.constants import INGREDIENT_LOAD_BATCH_SIZE
+from recipes.models import Ingredient
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            name, measurement_unit = row
+            yield name, measurement_unit
+
+
+def read_json(file, chunk_size=64 * 1024):
+    """Потоково разбирает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив')
+                started = True
+                position += 1
+                continue
+            if position >= len(buffer) or buffer[position] == ']':
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+    if buffer.strip() not in ('', ']'):
+        raise CommandError('Некорректный JSON')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV или JSON пачками; '
+        'уже существующие пары (name, measurement_unit) пропускаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='data/ingredients.csv или .json')
+        parser.add_argument(
+            '--batch-size', type=int, default=INGREDIENT_LOAD_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только .csv и .json')
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        processed = 0
+        with path.open(encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                processed += len(batch)
+        created = Ingredient.objects.count() - before
+        elapsed = time.monotonic() - started
+        ingredients_cache.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, добавлено: {created}, '
+            f'пропущено: {processed - created}, '
+            f'{elapsed:.2f} с ({processed / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import BuyList, Favorite, Recipe
+from users.models import Follow, User
+from users.signals import count_subquery
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики рецептов и пользователей'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_subquery(Favorite, 'recipe'),
+            shopping_cart_count=count_subquery(BuyList, 'recipe'),
+        )
+        users = User.objects.update(
+            recipes_count=count_subquery(Recipe, 'author'),
+            followers_count=count_subquery(Follow, 'following'),
+            following_count=count_subquery(Follow, 'user'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, пользователей: {users}'
+        ))
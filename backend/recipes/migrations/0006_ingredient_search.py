@@ -0,0 +1,42 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_prefix_idx '
+        'ON recipes_ingredient (LOWER(name) text_pattern_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm_idx '
+        'ON recipes_ingredient USING gin (LOWER(name) gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_ingredient_name_prefix_idx'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_ingredient_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
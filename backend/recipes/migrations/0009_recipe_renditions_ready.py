@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_feed_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Уменьшенные копии изображения готовы'),
+        ),
+    ]
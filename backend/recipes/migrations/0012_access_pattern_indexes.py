@@ -0,0 +1,63 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:09
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Повторы ингредиента в рецепте сливаются в одну строку с суммой
+    количеств, повторы тега удаляются.
+    """
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    RecipeTag = apps.get_model('recipes', 'RecipeTag')
+    duplicates = (
+        RecipeIngredient.objects
+        .values('recipe', 'ingredient')
+        .annotate(keep=Min('id'), amount=Sum('amount'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        RecipeIngredient.objects.filter(
+            recipe=duplicate['recipe'], ingredient=duplicate['ingredient']
+        ).exclude(id=duplicate['keep']).delete()
+        RecipeIngredient.objects.filter(id=duplicate['keep']).update(
+            amount=duplicate['amount']
+        )
+    duplicates = (
+        RecipeTag.objects
+        .values('recipe', 'tag')
+        .annotate(keep=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        RecipeTag.objects.filter(
+            recipe=duplicate['recipe'], tag=duplicate['tag']
+        ).exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feed_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created', '-id'], name='recipe_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tag', 'recipe'], name='recipetag_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique__recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipetag',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='unique__recipe_tag'),
+        ),
+    ]
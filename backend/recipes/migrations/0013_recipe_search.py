@@ -0,0 +1,50 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:11
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс и первичное заполнение search_vector."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE recipes_recipe AS recipe SET search_vector = "
+        "setweight(to_tsvector('russian', COALESCE(recipe.name, '')), 'A') "
+        "|| setweight(to_tsvector('russian', COALESCE(("
+        "SELECT string_agg(ingredient.name, ' ') "
+        "FROM recipes_recipeingredient AS item "
+        "JOIN recipes_ingredient AS ingredient "
+        "ON ingredient.id = item.ingredient_id "
+        "WHERE item.recipe_id = recipe.id"
+        "), '')), 'B') "
+        "|| setweight(to_tsvector('russian', COALESCE(recipe.text, '')), 'C')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+UNITS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+    ('стакан', 'мл', 250),
+    ('ст. л.', 'мл', 15),
+    ('ч. л.', 'мл', 5),
+)
+
+
+def create_units(apps, schema_editor):
+    MeasurementUnit = apps.get_model('recipes', 'MeasurementUnit')
+    MeasurementUnit.objects.bulk_create(
+        MeasurementUnit(name=name, base_unit=base_unit, factor=factor)
+        for name, base_unit, factor in UNITS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementUnit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='Единица измерения')),
+                ('base_unit', models.CharField(max_length=200, verbose_name='Базовая единица')),
+                ('factor', models.PositiveIntegerField(verbose_name='Множитель')),
+            ],
+            options={
+                'verbose_name': 'Единица измерения',
+                'verbose_name_plural': 'Единицы измерения',
+            },
+        ),
+        migrations.RunPython(create_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+def mark_pushed(apps, schema_editor):
+    """
+    Разосланными считаются рецепты, у которых есть записи во входящих;
+    остальные читаются по подпискам и из ленты не пропадают.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe.objects.filter(
+        pk__in=FeedEntry.objects.values('recipe')
+    ).update(pushed_to_feed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_measurement_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='pushed_to_feed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан во входящие подписчиков'),
+        ),
+        migrations.RunPython(mark_pushed, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,21 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import (BooleanField, Case, Exists, F, IntegerField,
+                              OuterRef, Prefetch, Q, Subquery, Sum, Value,
+                              When, Window)
+from django.db.models.functions import Coalesce, Lower, RowNumber
 
 from foodgram_backend.constants import (MAX_COOKING_TIME,
                                         MAX_INGREDIENT_AMOUNT,
                                         MAX_MEASUREMENT_UNIT_LENGTH,
                                         MAX_NAME_LENGTH, MIN_COOKING_TIME,
-                                        MIN_INGREDIENT_AMOUNT)
-from users.models import User
+                                        MIN_INGREDIENT_AMOUNT,
+                                        RECIPE_SEARCH_CONFIG)
+from users.models import Follow, User
 
 
 class Tag(models.Model):
@@ -24,29 +32,215 @@ class Tag(models.Model):
         return self.name
 
 
+class IngredientQuerySet(models.QuerySet):
+
+    def search(self, term):
+        """
+        Поиск для автодополнения: сначала совпадения по началу названия,
+        затем по подстроке. Части объединены UNION ALL, чтобы на
+        PostgreSQL префикс искался по индексу LOWER(name) text_pattern_ops,
+        а подстрока — по pg_trgm (см. миграцию 0006).
+        """
+        term = term.lower()
+        matches = self.annotate(name_lower=Lower('name'))
+        prefix = matches.filter(name_lower__startswith=term).annotate(
+            rank=Value(0, output_field=IntegerField())
+        )
+        substring = (
+            matches
+            .filter(name_lower__contains=term)
+            .exclude(name_lower__startswith=term)
+            .annotate(rank=Value(1, output_field=IntegerField()))
+        )
+        return prefix.union(substring, all=True).order_by('rank', 'name_lower')
+
+
 class Ingredient(models.Model):
     """Модель ингредиента"""
 
-    name = models.TextField(max_length=MAX_NAME_LENGTH)
+    name = models.CharField(max_length=MAX_NAME_LENGTH)
     measurement_unit = models.CharField(max_length=MAX_MEASUREMENT_UNIT_LENGTH)
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique__ingredient',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        """Флаги is_favorited и is_in_shopping_cart одним запросом."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(BuyList.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    @staticmethod
+    def read_prefetches(user):
+        """Связи рецепта, которые выводит RecipeReadSerializer."""
+        return (
+            Prefetch(
+                'author', queryset=User.objects.with_is_subscribed(user)
+            ),
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def for_read(self, user):
+        """
+        Рецепты со всем, что нужно RecipeReadSerializer: страница
+        загружается фиксированным числом запросов независимо от её размера.
+        """
+        return self.with_user_flags(user).prefetch_related(
+            *self.read_prefetches(user)
+        )
+
+    def feed(self, user):
+        """
+        Лента подписок: рецепты из входящих пользователя плюс
+        неразосланные рецепты авторов из подписок — их читаем напрямую.
+        Способ доставки записан в рецепте при рассылке, поэтому рецепт
+        не пропадает, когда число подписчиков автора пересекает
+        FEED_FANOUT_MAX_FOLLOWERS.
+        """
+        return self.filter(
+            Q(Exists(FeedEntry.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )))
+            | Q(
+                pushed_to_feed=False,
+                author__in=Follow.objects.filter(user=user).values(
+                    'following'
+                )
+            )
+        )
+
+    def search(self, term):
+        """
+        Полнотекстовый поиск по названию, ингредиентам и описанию
+        с ранжированием. На PostgreSQL — по search_vector под GIN-индексом
+        (см. миграцию 0013), на остальных СУБД — подстрока в LOWER().
+        """
+        if connections[self.db].vendor == 'postgresql':
+            query = SearchQuery(
+                term, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+            )
+            return (
+                self.filter(search_vector=query)
+                .annotate(rank=SearchRank(F('search_vector'), query))
+                .order_by('-rank', '-created', '-id')
+            )
+        term = term.lower()
+        in_ingredients = Exists(
+            RecipeIngredient.objects
+            .annotate(name_lower=Lower('ingredient__name'))
+            .filter(recipe=OuterRef('pk'), name_lower__contains=term)
+        )
+        return (
+            self.annotate(
+                name_lower=Lower('name'),
+                text_lower=Lower('text'),
+            )
+            .filter(
+                Q(name_lower__contains=term)
+                | Q(in_ingredients)
+                | Q(text_lower__contains=term)
+            )
+            .annotate(rank=Case(
+                When(name_lower__contains=term, then=Value(0)),
+                When(in_ingredients, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            ))
+            .order_by('rank', '-created', '-id')
+        )
+
+    def update_search_vector(self):
+        """Пересчитывает search_vector одним UPDATE; только PostgreSQL."""
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        ingredient_names = Subquery(
+            RecipeIngredient.objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(names=StringAgg('ingredient__name', ' '))
+            .values('names')
+        )
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=RECIPE_SEARCH_CONFIG)
+            + SearchVector(
+                ingredient_names, weight='B', config=RECIPE_SEARCH_CONFIG
+            )
+            + SearchVector('text', weight='C', config=RECIPE_SEARCH_CONFIG)
+        ))
+
+    def top_per_author(self, authors, limit=None):
+        """
+        Не более limit последних рецептов каждого автора одним запросом:
+        ROW_NUMBER() OVER (PARTITION BY author) во вложенном SELECT.
+        """
+        if not authors:
+            return self.none()
+        recipes = self.filter(author__in=authors)
+        if limit is None:
+            return recipes.order_by('-created', '-id')
+        ranked = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=[F('created').desc(), F('id').desc()],
+        ))
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            f'WHERE ranked.row_number <= %s '
+            f'ORDER BY ranked.row_number',
+            (*params, limit)
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта"""
+    # Отдельный индекс не нужен: его покрывает recipe_author_created_idx.
     author = models.ForeignKey(
-        User, related_name='recipes', on_delete=models.CASCADE
+        User, related_name='recipes', on_delete=models.CASCADE,
+        db_index=False
     )
     name = models.CharField(max_length=MAX_NAME_LENGTH)
     image = models.ImageField(
         upload_to='recipes/images/', null=True, default=None
     )
+    renditions_ready = models.BooleanField(
+        default=False, editable=False,
+        verbose_name='Уменьшенные копии изображения готовы'
+    )
+    pushed_to_feed = models.BooleanField(
+        default=False, editable=False,
+        verbose_name='Разослан во входящие подписчиков'
+    )
     text = models.TextField()
     ingredients = models.ManyToManyField(
         Ingredient, through='RecipeIngredient'
@@ -64,10 +258,32 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата и время публикации рецепта'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата и время изменения рецепта'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном'
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В списках покупок'
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ('-created', '-id')
+        indexes = (
+            models.Index(
+                fields=('-created', '-id'), name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='recipe_author_created_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -85,11 +301,31 @@ class RecipeIngredient(models.Model):
         ]
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique__recipe_ingredient',
+            ),
+        )
+
 
 class RecipeTag(models.Model):
     """Many to Many Рецепт-Тэг"""
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
-    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    # Отдельный индекс не нужен: его покрывает recipetag_tag_idx.
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'tag'),
+                name='unique__recipe_tag',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('tag', 'recipe'), name='recipetag_tag_idx'),
+        )
 
     def __str__(self):
         return self.tag.name
@@ -135,3 +371,99 @@ class BuyList(models.Model):
                 name='unique__recipe_buylist',
             ),
         )
+
+
+class FeedEntry(models.Model):
+    """Входящие ленты подписок: рецепт, доставленный подписчику"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique__feed_entry',
+            ),
+        )
+
+
+class MeasurementUnit(models.Model):
+    """Перевод единицы измерения в базовую: 1 кг = 1000 г"""
+    name = models.CharField(
+        max_length=MAX_MEASUREMENT_UNIT_LENGTH, unique=True,
+        verbose_name='Единица измерения'
+    )
+    base_unit = models.CharField(
+        max_length=MAX_MEASUREMENT_UNIT_LENGTH,
+        verbose_name='Базовая единица'
+    )
+    factor = models.PositiveIntegerField(verbose_name='Множитель')
+
+    class Meta:
+        verbose_name = 'Единица измерения'
+        verbose_name_plural = 'Единицы измерения'
+
+    def __str__(self):
+        return f'1 {self.name} = {self.factor} {self.base_unit}'
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+
+    def totals(self, user):
+        """
+        Список покупок в базовых единицах одним запросом: единица
+        ингредиента переводится по таблице MeasurementUnit прямо
+        в агрегате, и «сахар, кг» суммируется с «сахар, г».
+        """
+        unit = MeasurementUnit.objects.filter(
+            name=OuterRef('ingredient__measurement_unit')
+        )
+        return (
+            self.filter(user=user)
+            .annotate(
+                ingredient_name=F('ingredient__name'),
+                unit=Coalesce(
+                    Subquery(unit.values('base_unit')[:1]),
+                    F('ingredient__measurement_unit')
+                ),
+            )
+            .values('ingredient_name', 'unit')
+            .annotate(total=Sum(F('amount') * Coalesce(
+                Subquery(unit.values('factor')[:1]), 1
+            )))
+            .order_by('ingredient_name', 'unit')
+        )
+
+
+class ShoppingListItem(models.Model):
+    """
+    Список покупок пользователя в свёрнутом виде: сумма ингредиента
+    по всем рецептам корзины. Поддерживается инкрементально
+    (см. recipes/shopping.py), сверяется командой check_shopping_lists.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shopping_list_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        related_name='shopping_list_items'
+    )
+    amount = models.IntegerField()
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique__shopping_list_item',
+            ),
+        )
@@ -0,0 +1,135 @@
+import random
+from io import StringIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+
+from foodgram_backend.constants import SEED_BATCH_SIZE
+from users.models import Follow, User
+
+from .models import (BuyList, Favorite, Ingredient, Recipe, RecipeIngredient,
+                     RecipeTag, Tag)
+from .shopping import rebuild
+
+SEED_PASSWORD = 'seed-password'
+SEED_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+
+
+def sample(population, count, rng):
+    return rng.sample(population, min(count, len(population)))
+
+
+def bulk_insert(model, objects, ignore_conflicts=False):
+    """bulk_create пачками из генератора, не держа все объекты в памяти."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, SEED_BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+
+
+@transaction.atomic
+def seed_dataset(users=100, recipes=1000, ingredients=500,
+                 ingredients_per_recipe=8, follows=10, favorites=20,
+                 cart=10, seed=0):
+    """
+    Синтетический набор данных только через bulk_create: число запросов
+    зависит от размера пачки, а не от числа строк. Счётчики
+    поисковые векторы и списки покупок пересчитываются в конце.
+    """
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD)
+
+    Tag.objects.bulk_create(
+        Tag(name=name, slug=slug, color=color)
+        for name, slug, color in SEED_TAGS
+    )
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    bulk_insert(
+        Ingredient, (
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(ingredients)
+        ),
+        ignore_conflicts=True
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+    bulk_insert(
+        User, (
+            User(
+                username=f'seed_user_{number}',
+                email=f'seed_user_{number}@example.com',
+                first_name='Сид', last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number in range(users)
+        )
+    )
+    user_ids = list(
+        User.objects
+        .filter(username__startswith='seed_user_')
+        .values_list('id', flat=True)
+    )
+
+    bulk_insert(
+        Recipe, (
+            Recipe(
+                author_id=rng.choice(user_ids),
+                name=f'Рецепт {number}',
+                text='Смешать и приготовить. ' * 5,
+                cooking_time=rng.randint(5, 120),
+            )
+            for number in range(recipes)
+        )
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+
+    bulk_insert(
+        RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id, ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(
+                ingredient_ids, ingredients_per_recipe, rng
+            )
+        )
+    )
+    bulk_insert(
+        RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in sample(tag_ids, rng.randint(1, len(tag_ids)), rng)
+        )
+    )
+    bulk_insert(
+        Follow, (
+            Follow(user_id=user_id, following_id=following_id)
+            for user_id in user_ids
+            for following_id in sample(user_ids, follows + 1, rng)[:follows]
+            if following_id != user_id
+        ),
+        ignore_conflicts=True
+    )
+    for model, per_user in ((Favorite, favorites), (BuyList, cart)):
+        bulk_insert(
+            model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in sample(recipe_ids, per_user, rng)
+            ),
+            ignore_conflicts=True
+        )
+
+    call_command('rebuild_counters', stdout=StringIO())
+    Recipe.objects.all().update_search_vector()
+    rebuild(user_ids)
+    return user_ids, recipe_ids
@@ -0,0 +1,87 @@
+from django.db import connection
+
+from .models import BuyList, RecipeIngredient, ShoppingListItem
+
+ITEMS = ShoppingListItem._meta.db_table
+CART = BuyList._meta.db_table
+RECIPE_INGREDIENTS = RecipeIngredient._meta.db_table
+
+UPSERT = (
+    f'INSERT INTO {ITEMS} (user_id, ingredient_id, amount) {{select}} '
+    f'ON CONFLICT (user_id, ingredient_id) '
+    f'DO UPDATE SET amount = {ITEMS}.amount + excluded.amount'
+)
+
+
+def execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def drop_empty(users):
+    """Позиции, обнулившиеся после вычитания, удаляются."""
+    ShoppingListItem.objects.filter(user__in=users, amount__lte=0).delete()
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) ингредиенты рецептов
+    в списке пользователя одним INSERT ... ON CONFLICT DO UPDATE.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    execute(
+        UPSERT.format(select=(
+            f'SELECT %s, ingredient_id, SUM(amount) * %s '
+            f'FROM {RECIPE_INGREDIENTS} '
+            f'WHERE recipe_id IN ({", ".join(["%s"] * len(recipe_ids))}) '
+            f'GROUP BY ingredient_id'
+        )),
+        [user_id, sign, *recipe_ids]
+    )
+    if sign < 0:
+        drop_empty([user_id])
+
+
+def apply_recipe_deltas(recipe_id, deltas):
+    """
+    Изменения ингредиентов рецепта {ingredient_id: delta} одним
+    запросом переносятся в списки всех, у кого рецепт в корзине.
+    """
+    deltas = [(pk, delta) for pk, delta in deltas.items() if delta]
+    if not deltas:
+        return
+    values = ' UNION ALL '.join(
+        ['SELECT %s AS ingredient_id, %s AS amount'] * len(deltas)
+    )
+    execute(
+        UPSERT.format(select=(
+            f'SELECT cart.user_id, delta.ingredient_id, delta.amount '
+            f'FROM {CART} AS cart, ({values}) AS delta '
+            f'WHERE cart.recipe_id = %s'
+        )),
+        [*(value for delta in deltas for value in delta), recipe_id]
+    )
+    if any(delta < 0 for _, delta in deltas):
+        drop_empty(BuyList.objects.filter(
+            recipe_id=recipe_id
+        ).values('user_id'))
+
+
+def rebuild(user_ids):
+    """Пересобирает списки пользователей из BuyList x RecipeIngredient."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    ShoppingListItem.objects.filter(user__in=user_ids).delete()
+    execute(
+        f'INSERT INTO {ITEMS} (user_id, ingredient_id, amount) '
+        f'SELECT cart.user_id, item.ingredient_id, SUM(item.amount) '
+        f'FROM {CART} AS cart '
+        f'JOIN {RECIPE_INGREDIENTS} AS item '
+        f'ON item.recipe_id = cart.recipe_id '
+        f'WHERE cart.user_id IN ({", ".join(["%s"] * len(user_ids))}) '
+        f'GROUP BY cart.user_id, item.ingredient_id',
+        user_ids
+    )
@@ -0,0 +1,140 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import Follow, User
+from users.signals import update_counter
+
+from .feed import backfill, fan_out, schedule_feed_task
+from .images import schedule_renditions
+from .models import (BuyList, Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredient)
+from .shopping import add_recipes, apply_recipe_deltas
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    if instance.image and not instance.renditions_ready:
+        transaction.on_commit(
+            partial(schedule_renditions, instance.image.name)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_fan_out(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            partial(schedule_feed_task, fan_out, instance.pk)
+        )
+
+
+def update_search_vector(**lookups):
+    transaction.on_commit(
+        partial(Recipe.objects.filter(**lookups).update_search_vector)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    """После коммита: ингредиенты рецепта к этому моменту уже записаны."""
+    update_search_vector(pk=instance.pk)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_search_changed(sender, instance, **kwargs):
+    update_search_vector(pk=instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(recipeingredient_set__ingredient=instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=BuyList)
+def buylist_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=BuyList)
+def buylist_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(
+            schedule_feed_task, backfill,
+            instance.user_id, instance.following_id
+        ))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_feed_cleared(sender, instance, **kwargs):
+    FeedEntry.objects.filter(
+        user_id=instance.user_id, recipe__author_id=instance.following_id
+    ).delete()
+
+
+@receiver(post_save, sender=BuyList)
+def buylist_shopping_list_added(sender, instance, created, **kwargs):
+    if created:
+        add_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=BuyList)
+def buylist_shopping_list_removed(sender, instance, **kwargs):
+    add_recipes(instance.user_id, [instance.recipe_id], sign=-1)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_remember_old(sender, instance, **kwargs):
+    instance._previous_state = None
+    if not instance._state.adding:
+        instance._previous_state = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_shopping_list_saved(sender, instance, **kwargs):
+    deltas = {instance.ingredient_id: instance.amount}
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        ingredient_id, amount = previous
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+    apply_recipe_deltas(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_shopping_list_deleted(sender, instance, **kwargs):
+    apply_recipe_deltas(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
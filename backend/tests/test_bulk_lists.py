@@ -0,0 +1,64 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import BuyList, Recipe, ShoppingListItem
+from recipes.seeding import seed_dataset
+from recipes.shopping import rebuild
+from users.models import User
+
+MISSING_ID = 10 ** 6
+
+
+class ShoppingCartBulkTest(TestCase):
+    """Пачка в корзине: статусы по записанным строкам, список — дельтой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user_ids, cls.recipe_ids = seed_dataset(
+            users=1, recipes=3, ingredients=10, favorites=0, cart=0
+        )
+        cls.user = User.objects.get(id=user_ids[0])
+        BuyList.objects.create(user=cls.user, recipe_id=cls.recipe_ids[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'amount'))
+
+    def assert_shopping_list_rebuilt(self):
+        """Инкрементальный список совпадает с пересобранным с нуля."""
+        incremental = self.shopping_list()
+        rebuild([self.user.id])
+        self.assertEqual(incremental, self.shopping_list())
+
+    def bulk(self, method, recipe_ids):
+        response = getattr(self.client, method)(
+            '/api/recipes/shopping_cart/bulk/', {'recipes': recipe_ids},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['status'] for item in response.data['results']]
+
+    def test_add_and_remove(self):
+        existing, new, _ = self.recipe_ids
+        self.assertEqual(
+            self.bulk('post', [existing, new, MISSING_ID]),
+            ['exists', 'added', 'not_found']
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=new).shopping_cart_count, 1
+        )
+        self.assert_shopping_list_rebuilt()
+
+        self.assertEqual(
+            self.bulk('delete', [existing, new, MISSING_ID]),
+            ['removed', 'removed', 'not_found']
+        )
+        self.assertEqual(self.shopping_list(), {})
+        self.assertEqual(
+            self.bulk('delete', [existing]), ['not_found']
+        )
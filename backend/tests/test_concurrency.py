@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+CONCURRENT_REQUESTS = 16
+
+
+class ConcurrentToggleTest(TransactionTestCase):
+    """
+    Параллельные добавления одного рецепта: уникальное ограничение
+    пропускает ровно одно, счётчик увеличивается один раз.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Текст', cooking_time=1
+        )
+
+    def post(self, path):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post(path).status_code
+        finally:
+            connection.close()
+
+    def assertSingleCreated(self, path, counter):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            codes = list(executor.map(
+                self.post, [path] * CONCURRENT_REQUESTS
+            ))
+        self.assertEqual(codes.count(201), 1, codes)
+        self.assertEqual(codes.count(400), CONCURRENT_REQUESTS - 1, codes)
+        self.recipe.refresh_from_db()
+        self.assertEqual(getattr(self.recipe, counter), 1)
+
+    def test_favorite(self):
+        self.assertSingleCreated(
+            f'/api/recipes/{self.recipe.id}/favorite/', 'favorites_count'
+        )
+
+    def test_shopping_cart(self):
+        self.assertSingleCreated(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+            'shopping_cart_count'
+        )
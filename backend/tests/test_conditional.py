@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe
+from recipes.seeding import seed_dataset
+
+
+class RecipeConditionalGetTest(TestCase):
+    """ETag меняется вместе со всем, что попадает в тело ответа."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=3, recipes=5, ingredients=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertChanged(self, path, change):
+        response = self.client.get(path)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_list_changes_when_older_recipe_deleted(self):
+        oldest = Recipe.objects.order_by('created', 'id').first()
+        response = self.assertChanged('/api/recipes/', oldest.delete)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_detail_changes_with_ingredient_and_author(self):
+        recipe = Recipe.objects.select_related('author').first()
+        ingredient = Ingredient.objects.filter(recipe=recipe).first()
+        path = f'/api/recipes/{recipe.pk}/'
+
+        def rename_ingredient():
+            ingredient.name = 'переименованный'
+            ingredient.save()
+
+        def rename_author():
+            recipe.author.first_name = 'Переименованный'
+            recipe.author.save()
+
+        response = self.assertChanged(path, rename_ingredient)
+        self.assertIn(
+            'переименованный',
+            [item['name'] for item in response.data['ingredients']]
+        )
+        response = self.assertChanged(path, rename_author)
+        self.assertEqual(
+            response.data['author']['first_name'], 'Переименованный'
+        )
@@ -0,0 +1,33 @@
+import random
+from unittest import skipUnless
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from api.v1.management.commands.benchmark_connections import (
+    connection_mode, measure)
+from users.models import User
+
+REQUESTS = 5
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Режимы соединений PostgreSQL'
+)
+class ConnectionModesTest(TransactionTestCase):
+    """Через WSGIHandler режимы открывают разное число соединений."""
+
+    def test_opened_connections(self):
+        user = User.objects.create(username='user', email='user@example.com')
+        tokens = [Token.objects.create(user=user).key]
+        handler = WSGIHandler()
+        for name, expected in (
+            ('none', REQUESTS), ('persistent', 1), ('pool', 1)
+        ):
+            with self.subTest(mode=name), connection_mode(name):
+                _, opened = measure(
+                    handler, tokens, REQUESTS, random.Random(0)
+                )
+                self.assertEqual(opened, expected)
@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.feed import backfill, fan_out
+from recipes.models import Recipe
+from users.models import Follow, User
+
+
+@mock.patch('recipes.feed.FEED_FANOUT_MAX_FOLLOWERS', 2)
+class FeedThresholdTest(TestCase):
+    """Рецепт не пропадает из ленты, когда автор пересекает порог."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader, cls.other = (
+            User.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('author', 'reader', 'other')
+        )
+
+    def publish(self, name):
+        recipe = Recipe.objects.create(
+            author=self.author, name=name, text='Текст', cooking_time=1
+        )
+        fan_out(recipe.id)
+        return recipe
+
+    def feed(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.get('/api/recipes/feed/', {'limit': 10})
+        return {recipe['name'] for recipe in response.data['results']}
+
+    def test_recipes_survive_threshold_crossings(self):
+        Follow.objects.create(user=self.reader, following=self.author)
+        other = Follow.objects.create(user=self.other, following=self.author)
+        pulled = self.publish('pulled')
+        self.assertFalse(Recipe.objects.get(pk=pulled.pk).pushed_to_feed)
+        self.assertEqual(self.feed(), {'pulled'})
+
+        other.delete()
+        pushed = self.publish('pushed')
+        self.assertTrue(Recipe.objects.get(pk=pushed.pk).pushed_to_feed)
+        self.assertEqual(self.feed(), {'pulled', 'pushed'})
+
+        Follow.objects.create(user=self.other, following=self.author)
+        self.publish('pulled again')
+        self.assertEqual(self.feed(), {'pulled', 'pushed', 'pulled again'})
+
+    def test_new_follower_gets_pushed_recipes(self):
+        self.publish('pushed')
+        Follow.objects.create(user=self.reader, following=self.author)
+        backfill(self.reader.id, self.author.id)
+        Follow.objects.create(user=self.other, following=self.author)
+        self.publish('pulled')
+        self.assertEqual(self.feed(), {'pushed', 'pulled'})
@@ -0,0 +1,50 @@
+import re
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.v1.views import RecipeViewSet
+from foodgram_backend.middleware import QueryBudgetExceeded
+from recipes.seeding import seed_dataset
+
+
+@override_settings(SQL_INSTRUMENTATION=True)
+class ServerTimingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=5, recipes=20, ingredients=20)
+
+    def test_serialization_is_reported_separately(self):
+        response = APIClient().get('/api/recipes/', {'limit': 20})
+        timings = dict(re.findall(
+            r'(\w+);dur=([\d.]+)', response['Server-Timing']
+        ))
+        self.assertEqual(
+            set(timings), {'db', 'app', 'serialize', 'render', 'total'}
+        )
+        self.assertGreater(float(timings['serialize']), 0)
+        self.assertLessEqual(
+            sum(float(timings[name]) for name in (
+                'db', 'app', 'serialize', 'render'
+            )),
+            float(timings['total']) + 0.5
+        )
+
+
+@override_settings(SQL_INSTRUMENTATION=True, SQL_INSTRUMENTATION_STRICT=True)
+class QueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=5, recipes=20, ingredients=20)
+
+    def test_within_budget(self):
+        response = APIClient().get('/api/recipes/', {'limit': 20})
+        self.assertEqual(response.status_code, 200)
+
+    def test_exceeded_budget_raises(self):
+        with mock.patch.object(RecipeViewSet, 'query_budget', {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                APIClient().get('/api/recipes/', {'limit': 20})
@@ -0,0 +1,58 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from api.v1.filters import RecipeFilter
+from recipes.models import Recipe, RecipeTag, Tag
+from recipes.seeding import seed_dataset
+from users.models import Follow, User
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Планы запросов PostgreSQL'
+)
+class AccessPatternIndexesTest(TestCase):
+    """Горячие выборки идут по индексам из миграций 0012 и users 0005."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=50, recipes=500, ingredients=50)
+        cls.author = User.objects.filter(recipes_count__gt=0).first()
+        # Редкий тег: по частому выгоднее идти по дате и проверять теги.
+        cls.tag = Tag.objects.create(name='Редкий', slug='rare')
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=cls.tag)
+            for recipe in Recipe.objects.all()[:3]
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            # На маленькой тестовой БД планировщик иначе выберет seq scan.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    def test_tag_filter(self):
+        self.assertUsesIndex(
+            RecipeFilter(
+                {'tags': [self.tag.slug]}, queryset=Recipe.objects.all()
+            ).qs.order_by('-created', '-id')[:6],
+            'recipetag_tag_idx'
+        )
+
+    def test_author_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(
+                author=self.author
+            ).order_by('-created', '-id')[:6],
+            'recipe_author_created_idx'
+        )
+
+    def test_follower_scan(self):
+        self.assertUsesIndex(
+            Follow.objects.filter(following=self.author).values('user'),
+            'follow_following_user_idx'
+        )
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.seeding import seed_dataset
+from users.models import User
+
+# Число запросов не зависит от размера страницы: автор, теги и
+# ингредиенты подгружаются фиксированным набором prefetch-запросов.
+LIST_QUERIES = {False: 6, True: 7}
+# Промах кэша карточки рецепта.
+RETRIEVE_QUERIES = {False: 6, True: 7}
+
+
+class RecipeQueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user_ids, cls.recipe_ids = seed_dataset(
+            users=20, recipes=150, ingredients=50
+        )
+        cls.user = User.objects.get(id=user_ids[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, authenticated):
+        client = APIClient()
+        if authenticated:
+            client.force_authenticate(self.user)
+        return client
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for authenticated, queries in LIST_QUERIES.items():
+            client = self.client_for(authenticated)
+            for limit in (6, 100):
+                with self.subTest(authenticated=authenticated, limit=limit):
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            '/api/recipes/', {'limit': limit}
+                        )
+                    self.assertEqual(len(response.data['results']), limit)
+
+    def test_retrieve_queries_do_not_depend_on_recipe(self):
+        for authenticated, queries in RETRIEVE_QUERIES.items():
+            client = self.client_for(authenticated)
+            for recipe_id in self.recipe_ids[:2]:
+                with self.subTest(
+                    authenticated=authenticated, recipe=recipe_id
+                ):
+                    cache.clear()
+                    with self.assertNumQueries(queries):
+                        response = client.get(f'/api/recipes/{recipe_id}/')
+                    self.assertEqual(response.status_code, 200)
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import BuyList, Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.seeding import seed_dataset
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+# Правка 30 ингредиентов: 10 без изменений, 10 с новым количеством,
+# 10 новых вместо 10 удалённых. Ингредиенты заменяются пятью запросами
+# (DELETE, INSERT, UPDATE и перенос разницы в списки покупок), остальное —
+# чтение рецепта, валидация, теги и сохранение рецепта. Для ответа
+# перечитываются только переписанные теги и ингредиенты.
+UPDATE_QUERIES = 19
+
+
+def png():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeIngredientsUpdateQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user_ids, _ = seed_dataset(
+            users=3, recipes=1, ingredients=40, favorites=0, cart=0
+        )
+        cls.author = User.objects.get(id=user_ids[0])
+        content = png()
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Текст', cooking_time=10,
+            image=ContentFile(
+                content, name=f'{hashlib.sha256(content).hexdigest()}.png'
+            )
+        )
+        cls.image = (
+            f'data:image/png;base64,{base64.b64encode(content).decode()}'
+        )
+        cls.ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=cls.recipe, ingredient_id=ingredient_id, amount=10
+            )
+            for ingredient_id in cls.ingredient_ids[:30]
+        )
+        for user_id in user_ids[1:]:
+            BuyList.objects.create(user_id=user_id, recipe=cls.recipe)
+        cls.tags = list(
+            Tag.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_update_thirty_ingredients(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        ingredients = [
+            {'id': ingredient_id, 'amount': 10}
+            for ingredient_id in self.ingredient_ids[:10]
+        ] + [
+            {'id': ingredient_id, 'amount': 20}
+            for ingredient_id in self.ingredient_ids[10:20]
+        ] + [
+            {'id': ingredient_id, 'amount': 30}
+            for ingredient_id in self.ingredient_ids[30:40]
+        ]
+        with self.assertNumQueries(UPDATE_QUERIES):
+            response = client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {
+                    'ingredients': ingredients, 'tags': self.tags,
+                    'image': self.image, 'name': 'Рецепт',
+                    'text': 'Текст', 'cooking_time': 10,
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        expected = {item['id']: item['amount'] for item in ingredients}
+        self.assertEqual(
+            dict(self.recipe.recipeingredient_set.values_list(
+                'ingredient_id', 'amount'
+            )),
+            expected
+        )
+        self.assertEqual(
+            {item['id']: item['amount']
+             for item in response.data['ingredients']},
+            expected
+        )
+        self.assertEqual(
+            sorted(tag['id'] for tag in response.data['tags']), self.tags
+        )
@@ -0,0 +1,45 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import BuyList
+from recipes.seeding import seed_dataset
+from recipes.shopping import rebuild
+from users.models import User
+
+CART_SIZES = (1, 10, 100)
+
+
+class DownloadShoppingCartQueriesTest(TestCase):
+    """Выгрузка списка покупок — один запрос при любом размере корзины."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user_ids, recipe_ids = seed_dataset(
+            users=len(CART_SIZES), recipes=max(CART_SIZES), ingredients=50,
+            favorites=0, cart=0
+        )
+        BuyList.objects.bulk_create(
+            BuyList(user_id=user_id, recipe_id=recipe_id)
+            for user_id, size in zip(user_ids, CART_SIZES)
+            for recipe_id in recipe_ids[:size]
+        )
+        rebuild(user_ids)
+        cls.users = {
+            size: User.objects.get(id=user_id)
+            for user_id, size in zip(user_ids, CART_SIZES)
+        }
+
+    def test_download_is_one_query(self):
+        client = APIClient()
+        for size, user in self.users.items():
+            client.force_authenticate(user)
+            for file_format in ('txt', 'csv', 'pdf'):
+                with self.subTest(size=size, format=file_format):
+                    with self.assertNumQueries(1):
+                        response = client.get(
+                            '/api/recipes/download_shopping_cart/',
+                            {'format': file_format}
+                        )
+                        content = b''.join(response.streaming_content)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(content)
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:53
+
+from django.db import migrations
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20240423_1946'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.FoodgramUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', 'user'], name='follow_following_user_idx'),
+        ),
+    ]
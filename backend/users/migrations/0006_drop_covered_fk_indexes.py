@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_follow_following_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='follow',
+            name='following',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL, verbose_name='Подписан на'),
+        ),
+    ]
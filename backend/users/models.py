@@ -1,15 +1,45 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Value
+
+
+class UserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        """Флаг подписки текущего пользователя одним запросом."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(is_subscribed=Exists(Follow.objects.filter(
+            user=user, following=OuterRef('pk')
+        )))
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
     """Юзер"""
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество подписок'
+    )
+
+    objects = FoodgramUserManager()
+
     def get_follower_count(self):
-        return self.followers.count()
+        return self.followers_count
 
     def get_recipe_count(self):
-        return self.recipes.count()
+        return self.recipes_count
 
 
 class Follow(models.Model):
@@ -20,11 +50,13 @@ class Follow(models.Model):
         related_name='followers',
         verbose_name='Пользователь',
     )
+    # Отдельный индекс не нужен: его покрывает follow_following_user_idx.
     following = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='following',
         verbose_name='Подписан на',
+        db_index=False,
     )
 
     class Meta:
@@ -36,6 +68,11 @@ class Follow(models.Model):
                 name='uniq__following',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['following', 'user'], name='follow_following_user_idx'
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.user == self.following:
@@ -0,0 +1,46 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Follow, User
+
+
+def update_counter(model, pk, field, delta):
+    """Атомарно сдвигает счётчик одним UPDATE без чтения строки."""
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    """COUNT(*) строк model, ссылающихся на внешнюю строку через field."""
+    return Coalesce(Subquery(
+        model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount_counter(model, pks, field, related_model, related_field):
+    """
+    Пересчитывает счётчик строк pks одним UPDATE — для массовых
+    операций, которые не отправляют сигналов по каждой строке.
+    """
+    model.objects.filter(pk__in=pks).update(
+        **{field: count_subquery(related_model, related_field)}
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.user_id, 'following_count', 1)
+        update_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.user_id, 'following_count', -1)
+    update_counter(User, instance.following_id, 'followers_count', -1)